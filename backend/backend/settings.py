@@ -141,6 +141,7 @@ DATABASES = {
 # -----------------------------------
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = ["X-Render-DPI"]
 
 # -----------------------------------
 # Password Validators
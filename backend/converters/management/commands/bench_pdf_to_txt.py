@@ -0,0 +1,74 @@
+import io
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from converters import utils as converter_utils
+from converters.utils import TXT_MODES, pdf_to_txt_bytes
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the PDF -> TXT extraction tiers on local files.
+
+    Usage:
+      python manage.py bench_pdf_to_txt report.pdf scans/ --repeat 3
+
+    The artifact and OCR caches are switched off for the run, so every
+    repeat does the full extraction.
+    """
+
+    help = "Time pdf-to-txt extraction for each mode (fast / balanced / accurate)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="PDF files or directories containing PDFs.")
+        parser.add_argument("--modes", default=",".join(TXT_MODES), help="Comma-separated modes to run.")
+        parser.add_argument("--repeat", type=int, default=1, help="Runs per file and mode (best time is reported).")
+        parser.add_argument("--ocr", action="store_true", help="Enable OCR fallback (off by default to time the text layer only).")
+
+    def handle(self, *args, **options):
+        modes = [m.strip() for m in options["modes"].split(",") if m.strip()]
+        unknown = [m for m in modes if m not in TXT_MODES]
+        if unknown:
+            raise CommandError(f"Unknown mode(s): {', '.join(unknown)}")
+
+        # Cache hits would time lookups, not extraction.
+        converter_utils._artifact_cache = None
+        converter_utils._ocr_cache = None
+
+        files = []
+        for path in options["paths"]:
+            if os.path.isdir(path):
+                for name in sorted(os.listdir(path)):
+                    if name.lower().endswith(".pdf"):
+                        files.append(os.path.join(path, name))
+            elif os.path.isfile(path):
+                files.append(path)
+            else:
+                raise CommandError(f"No such file or directory: {path}")
+        if not files:
+            raise CommandError("No PDF files found.")
+
+        totals = {m: 0.0 for m in modes}
+        self.stdout.write(f"{'file':40} {'mode':9} {'seconds':>9} {'chars':>10}")
+        for path in files:
+            with open(path, "rb") as f:
+                pdf_bytes = f.read()
+
+            for mode in modes:
+                best = None
+                out = b""
+                for _ in range(max(1, options["repeat"])):
+                    start = time.perf_counter()
+                    out = pdf_to_txt_bytes(io.BytesIO(pdf_bytes), ocr=options["ocr"], mode=mode)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                totals[mode] += best
+                self.stdout.write(f"{os.path.basename(path)[:40]:40} {mode:9} {best:9.3f} {len(out):10d}")
+
+        self.stdout.write("")
+        baseline = totals.get("accurate")
+        for mode in modes:
+            speedup = f"  x{baseline / totals[mode]:.1f} vs accurate" if baseline and totals[mode] else ""
+            self.stdout.write(f"total {mode:9} {totals[mode]:9.3f}s{speedup}")
@@ -0,0 +1,72 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from converters.utils import RASTER_BACKENDS, get_raster_backend
+
+
+class Command(BaseCommand):
+    """
+    Compare the rasterization backends on local files.
+
+    Usage:
+      python manage.py bench_raster_backends report.pdf scans/ --dpi 150 --repeat 3
+    """
+
+    help = "Time page rasterization for each available backend (poppler / pdfium)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="PDF files or directories containing PDFs.")
+        parser.add_argument("--backends", default=",".join(RASTER_BACKENDS), help="Comma-separated backends to run.")
+        parser.add_argument("--dpi", type=int, default=150)
+        parser.add_argument("--repeat", type=int, default=1, help="Runs per file and backend (best time is reported).")
+
+    def handle(self, *args, **options):
+        names = [b.strip() for b in options["backends"].split(",") if b.strip()]
+        try:
+            backends = [get_raster_backend(name) for name in names]
+        except (ValueError, RuntimeError) as e:
+            raise CommandError(str(e))
+
+        files = []
+        for path in options["paths"]:
+            if os.path.isdir(path):
+                for name in sorted(os.listdir(path)):
+                    if name.lower().endswith(".pdf"):
+                        files.append(os.path.join(path, name))
+            elif os.path.isfile(path):
+                files.append(path)
+            else:
+                raise CommandError(f"No such file or directory: {path}")
+        if not files:
+            raise CommandError("No PDF files found.")
+
+        dpi = options["dpi"]
+        totals = {b.name: 0.0 for b in backends}
+        page_totals = {b.name: 0 for b in backends}
+        self.stdout.write(f"{'file':40} {'backend':8} {'seconds':>9} {'pages':>6} {'ms/page':>8}")
+        for path in files:
+            with open(path, "rb") as f:
+                pdf_bytes = f.read()
+
+            for backend in backends:
+                best = None
+                count = 0
+                for _ in range(max(1, options["repeat"])):
+                    start = time.perf_counter()
+                    count = len(backend.render(pdf_bytes, dpi))
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                totals[backend.name] += best
+                page_totals[backend.name] += count
+                per_page = 1000 * best / count if count else 0.0
+                self.stdout.write(
+                    f"{os.path.basename(path)[:40]:40} {backend.name:8} {best:9.3f} {count:6d} {per_page:8.1f}"
+                )
+
+        self.stdout.write("")
+        baseline = totals.get("poppler")
+        for name, total in totals.items():
+            speedup = f"  x{baseline / total:.1f} vs poppler" if baseline and total else ""
+            self.stdout.write(f"total {name:8} {total:9.3f}s {page_totals[name]:6d} pages{speedup}")
@@ -0,0 +1,309 @@
+# converters/scratch.py
+# Scratch space for conversion jobs: per-job directories with byte quotas and cleanup.
+
+import atexit
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+_SCRATCH_DIR = os.environ.get("SCRATCH_DIR", os.path.join(tempfile.gettempdir(), "pdfapp_scratch"))
+# Put jobs on tmpfs (RAM) when it has room for a full job quota; otherwise they spill to SCRATCH_DIR
+_SCRATCH_TMPFS = os.environ.get("SCRATCH_TMPFS", "0").lower() in ("1", "true", "yes")
+_SCRATCH_TMPFS_DIR = os.environ.get("SCRATCH_TMPFS_DIR", "/dev/shm/pdfapp_scratch")
+_SCRATCH_JOB_MAX_BYTES = int(os.environ.get("SCRATCH_JOB_MAX_BYTES", str(2 * 1024 ** 3)))
+_SCRATCH_TOTAL_MAX_BYTES = int(os.environ.get("SCRATCH_TOTAL_MAX_BYTES", str(20 * 1024 ** 3)))
+# Directories of dead processes are always swept; live-looking ones older than this too (pid reuse)
+_SCRATCH_MAX_AGE = int(os.environ.get("SCRATCH_MAX_AGE_SECONDS", str(6 * 3600)))
+_SCRATCH_KEEP_ON_ERROR = os.environ.get("SCRATCH_KEEP_ON_ERROR", "0").lower() in ("1", "true", "yes")
+# Stale directories are swept, and other processes' usage re-measured, at most this often
+_SCRATCH_SWEEP_INTERVAL = int(os.environ.get("SCRATCH_SWEEP_INTERVAL_SECONDS", "60"))
+
+
+class ScratchQuotaExceeded(RuntimeError):
+    pass
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def _owner_pid(name: str) -> Optional[int]:
+    """pid from a job directory name "<prefix>-<pid>_<id>"."""
+    try:
+        return int(name.rsplit("_", 1)[0].rsplit("-", 1)[-1])
+    except ValueError:
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ScratchJob:
+    """
+    One job's private directory with a running byte count. Files written
+    by subprocesses are counted once track() has seen them; call check()
+    after big steps.
+    """
+
+    def __init__(self, manager: "ScratchManager", path: str, max_bytes: int):
+        self.manager = manager
+        self.path = path
+        self.max_bytes = max_bytes
+        self.created = time.time()
+        self.used = 0
+        self._sizes: Dict[str, int] = {}
+
+    def path_for(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def usage(self) -> int:
+        return self.used
+
+    def _set_size(self, path: str, size: int) -> None:
+        delta = size - self._sizes.get(path, 0)
+        if size:
+            self._sizes[path] = size
+        else:
+            self._sizes.pop(path, None)
+        self.used += delta
+        self.manager._add_usage(delta)
+
+    def track(self, *paths: str) -> None:
+        """
+        Count the given files (default: every file directly in the job
+        directory, e.g. after a subprocess wrote into it) at their current size.
+        """
+        if not paths:
+            with os.scandir(self.path) as entries:
+                paths = tuple(e.path for e in entries if e.is_file(follow_symlinks=False))
+        for path in paths:
+            try:
+                size = os.lstat(path).st_size
+            except OSError:
+                size = 0
+            self._set_size(path, size)
+
+    def remove(self, path: str) -> None:
+        """Delete a file from the job directory before the job ends."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        self._set_size(path, 0)
+
+    def check(self, extra: int = 0) -> None:
+        """
+        Raise ScratchQuotaExceeded if this job, or scratch space as a whole,
+        is over quota counting extra bytes about to be written.
+        """
+        used = self.used + extra
+        if used > self.max_bytes:
+            raise ScratchQuotaExceeded(
+                f"Job scratch space exceeded: {used} bytes used, limit {self.max_bytes}."
+            )
+        if self.manager.total_usage() + extra > self.manager.total_max_bytes:
+            raise ScratchQuotaExceeded("Scratch space is full; try again later.")
+
+    def write_bytes(self, name: str, data: bytes) -> str:
+        self.check(extra=len(data))
+        path = self.path_for(name)
+        with open(path, "wb") as f:
+            f.write(data)
+        self._set_size(path, len(data))
+        return path
+
+
+class ScratchManager:
+    """
+    Hands out per-job scratch directories named <prefix>-<pid>_<id> under
+    the scratch roots, enforces per-job and global byte quotas, and removes
+    the directory when the job ends. Directories left behind by crashed
+    processes are swept periodically and at interpreter exit.
+
+    Quotas are checked against running counters: this process's jobs
+    count what they write, and other processes' directories are measured
+    only when sweeping. Only sweep_stale() and usage() walk the roots.
+    """
+
+    def __init__(
+        self,
+        root: str = _SCRATCH_DIR,
+        tmpfs_root: Optional[str] = _SCRATCH_TMPFS_DIR if _SCRATCH_TMPFS else None,
+        job_max_bytes: int = _SCRATCH_JOB_MAX_BYTES,
+        total_max_bytes: int = _SCRATCH_TOTAL_MAX_BYTES,
+    ):
+        self.root = root
+        self.tmpfs_root = tmpfs_root
+        self.job_max_bytes = job_max_bytes
+        self.total_max_bytes = total_max_bytes
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ScratchJob] = {}
+        self._own_bytes = 0
+        self._others_bytes = 0
+        self._last_sweep: Optional[float] = None
+
+    def _roots(self) -> List[str]:
+        return [r for r in (self.tmpfs_root, self.root) if r]
+
+    def _pick_root(self, max_bytes: int) -> str:
+        if self.tmpfs_root:
+            try:
+                os.makedirs(self.tmpfs_root, exist_ok=True)
+                if shutil.disk_usage(self.tmpfs_root).free > max_bytes:
+                    return self.tmpfs_root
+            except OSError:
+                logger.warning("tmpfs scratch root %s unavailable; using %s", self.tmpfs_root, self.root)
+        os.makedirs(self.root, exist_ok=True)
+        return self.root
+
+    def _add_usage(self, delta: int) -> None:
+        with self._lock:
+            self._own_bytes += delta
+
+    def total_usage(self) -> int:
+        """This process's running count plus other processes' usage as of the last sweep."""
+        return self._own_bytes + self._others_bytes
+
+    def sweep_stale(self) -> int:
+        """
+        Remove job directories whose process is gone (or that are too old)
+        and re-measure the ones left by other processes. Returns how many
+        were removed.
+        """
+        removed = 0
+        others = 0
+        now = time.time()
+        self._last_sweep = now
+        for root in self._roots():
+            try:
+                names = os.listdir(root)
+            except OSError:
+                continue
+            for name in names:
+                path = os.path.join(root, name)
+                if path in self._jobs:
+                    continue
+                pid = _owner_pid(name)
+                try:
+                    age = now - os.stat(path).st_mtime
+                except OSError:
+                    continue
+                if (pid is not None and not _pid_alive(pid)) or age > _SCRATCH_MAX_AGE:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+                elif os.path.isdir(path):
+                    others += _dir_size(path)
+        self._others_bytes = others
+        if removed:
+            logger.info("Removed %d stale scratch directories.", removed)
+        return removed
+
+    @contextmanager
+    def job(self, prefix: str = "job", max_bytes: Optional[int] = None):
+        """
+        Context manager yielding a ScratchJob. The directory is removed on
+        exit, including on error (unless SCRATCH_KEEP_ON_ERROR is set).
+        """
+        max_bytes = max_bytes or self.job_max_bytes
+        if self._last_sweep is None or time.time() - self._last_sweep > _SCRATCH_SWEEP_INTERVAL:
+            self.sweep_stale()
+        if self.total_usage() >= self.total_max_bytes:
+            raise ScratchQuotaExceeded("Scratch space is full; try again later.")
+
+        root = self._pick_root(max_bytes)
+        path = os.path.join(root, f"{prefix.rstrip('_')}-{os.getpid()}_{uuid.uuid4().hex[:12]}")
+        os.makedirs(path)
+        job = ScratchJob(self, path, max_bytes)
+        with self._lock:
+            self._jobs[path] = job
+        failed = False
+        try:
+            yield job
+        except GeneratorExit:
+            # A streaming response that was closed early is not a failure.
+            raise
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._jobs.pop(path, None)
+                self._own_bytes -= job.used
+            if failed and _SCRATCH_KEEP_ON_ERROR:
+                logger.warning("Keeping scratch directory of failed job: %s", path)
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def output_file(self, suffix: str = "", spool_bytes: int = 0):
+        """
+        Anonymous (already unlinked) temp file on the disk root for results
+        handed to the response; it disappears when closed or on crash. With
+        spool_bytes, output stays in memory until it grows past that size.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        if spool_bytes > 0:
+            return tempfile.SpooledTemporaryFile(max_size=spool_bytes, dir=self.root, prefix="out-", suffix=suffix)
+        return tempfile.TemporaryFile(dir=self.root, prefix="out-", suffix=suffix)
+
+    def usage(self) -> dict:
+        """Current usage of every job directory on disk, across all worker processes."""
+        now = time.time()
+        jobs = []
+        for root in self._roots():
+            try:
+                names = sorted(os.listdir(root))
+            except OSError:
+                continue
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                jobs.append({
+                    "path": path,
+                    "pid": _owner_pid(name),
+                    "bytes": _dir_size(path) if os.path.isdir(path) else st.st_size,
+                    "age_seconds": round(now - st.st_mtime, 1),
+                })
+        return {
+            "roots": self._roots(),
+            "tmpfs": bool(self.tmpfs_root),
+            "total_bytes": sum(j["bytes"] for j in jobs),
+            "total_max_bytes": self.total_max_bytes,
+            "job_max_bytes": self.job_max_bytes,
+            "jobs": jobs,
+        }
+
+    def _cleanup_own(self) -> None:
+        with self._lock:
+            paths = list(self._jobs)
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+scratch = ScratchManager()
+atexit.register(scratch._cleanup_own)
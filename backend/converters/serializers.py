@@ -1,5 +1,13 @@
 from rest_framework import serializers
 
+from .utils import parse_page_ranges
+
+# keep: convert as usual, skip: drop blank pages, placeholder: cheap fixed output for them.
+# A page is blank when a 72 dpi render shows no marks beyond isolated specks.
+BLANK_PAGE_CHOICES = ["keep", "skip", "placeholder"]
+# omitted: the deployment default (PDF_RASTER_BACKEND)
+RASTER_BACKEND_CHOICES = ["poppler", "pdfium"]
+
 
 # =========================
 # TXT → PDF
@@ -82,6 +90,11 @@ class ImagesToPDFSerializer(serializers.Serializer):
     )
     file = serializers.FileField(required=False)
 
+    # omitted: each page is the image at 72 dpi; with page_size images are fitted onto that page
+    page_size = serializers.ChoiceField(required=False, choices=["A4", "LETTER"])
+    # downsample images with more pixels than page size x dpi
+    dpi = serializers.IntegerField(required=False, min_value=36, max_value=600)
+
     def validate(self, attrs):
         files_list = attrs.get("files")
         single = attrs.get("file")
@@ -117,6 +130,8 @@ class DocxToPdfSerializer(serializers.Serializer):
 # =========================
 class PDFUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
+    # e.g. "1-3,7,10-" (1-based, open-ended ranges run to the last page)
+    pages = serializers.CharField(required=False, allow_blank=True, default="")
 
     def validate_file(self, value):
         name = getattr(value, "name", "").lower()
@@ -128,6 +143,35 @@ class PDFUploadSerializer(serializers.Serializer):
 
         return value
 
+    def validate_pages(self, value):
+        value = (value or "").strip()
+        if not value:
+            return ""
+        try:
+            parse_page_ranges(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+
+# =========================
+# PDF → DOCX
+# =========================
+class PDFToDocxSerializer(PDFUploadSerializer):
+    # omitted: parallel for longer documents; cpu_count is capped by PDF2DOCX_CPU_COUNT
+    parallel = serializers.BooleanField(required=False, allow_null=True, default=None)
+    cpu_count = serializers.IntegerField(required=False, min_value=1, max_value=64)
+
+
+# =========================
+# PDF → EXCEL
+# =========================
+class PDFToExcelSerializer(PDFUploadSerializer):
+    # minimum table-likelihood score (0-1) before a page is searched for tables; 0 searches every page
+    table_threshold = serializers.FloatField(required=False, min_value=0.0, max_value=1.0)
+    # xlsx: one sheet per table, csv: streamed ZIP of per-table CSVs, parquet: all tables in one file
+    output_format = serializers.ChoiceField(required=False, choices=["xlsx", "csv", "parquet"], default="xlsx")
+
 
 # =========================
 # PDF → TXT
@@ -137,6 +181,15 @@ class PDFToTxtSerializer(PDFUploadSerializer):
     lang = serializers.CharField(required=False, default="eng")
     join_pages = serializers.CharField(required=False, default="\n\n----- PAGE BREAK -----\n\n")
     preserve_layout = serializers.BooleanField(required=False, default=True)
+    # fast: content-stream order, balanced: line grouping only (plain prose pages take the fast path),
+    # accurate: full layout analysis
+    mode = serializers.ChoiceField(
+        required=False,
+        choices=["fast", "balanced", "accurate"],
+        default="accurate"
+    )
+    blank_pages = serializers.ChoiceField(required=False, choices=BLANK_PAGE_CHOICES, default="keep")
+    raster_backend = serializers.ChoiceField(required=False, choices=RASTER_BACKEND_CHOICES)
 
 
 # =========================
@@ -144,6 +197,12 @@ class PDFToTxtSerializer(PDFUploadSerializer):
 # =========================
 class PDFToPPTXSerializer(PDFUploadSerializer):
     dpi = serializers.IntegerField(required=False, min_value=72, max_value=400, default=150)
+    # auto: JPEG for photographic pages, PNG for text / line art
+    image_format = serializers.ChoiceField(required=False, choices=["auto", "png", "jpeg"], default="auto")
+    # image: one picture per slide, text: editable text boxes, only images / curves rasterized
+    layout = serializers.ChoiceField(required=False, choices=["image", "text"], default="image")
+    blank_pages = serializers.ChoiceField(required=False, choices=BLANK_PAGE_CHOICES, default="keep")
+    raster_backend = serializers.ChoiceField(required=False, choices=RASTER_BACKEND_CHOICES)
 
 
 # =========================
@@ -152,3 +211,5 @@ class PDFToPPTXSerializer(PDFUploadSerializer):
 class PDFToJPGSerializer(PDFUploadSerializer):
     dpi = serializers.IntegerField(required=False, min_value=50, max_value=600, default=200)
     first_page_only = serializers.BooleanField(required=False, default=False)
+    blank_pages = serializers.ChoiceField(required=False, choices=BLANK_PAGE_CHOICES, default="keep")
+    raster_backend = serializers.ChoiceField(required=False, choices=RASTER_BACKEND_CHOICES)
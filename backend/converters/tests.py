@@ -1,3 +1,292 @@
-from django.test import TestCase
+import io
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+import numpy as np
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+from PIL import Image
+
+from .utils import (
+    _RASTER_MAX_PAGE_PIXELS,
+    _RASTER_MIN_DPI,
+    HAS_PDFIUM,
+    HAS_REPORTLAB,
+    PageSelectionError,
+    RasterBudgetExceeded,
+    _classify_colorspace,
+    _has_visible_marks,
+    _is_blank_thumbnail,
+    _iter_pdfplumber_pages,
+    _resolve_pages,
+    get_raster_backend,
+    images_to_pdf_bytes,
+    parse_page_ranges,
+    plan_raster_dpi,
+)
+
+if HAS_REPORTLAB:
+    from reportlab.pdfgen import canvas
+
+
+def _make_pdf(page_count: int) -> bytes:
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    for n in range(1, page_count + 1):
+        c.drawString(72, 760, f"Page {n}: the quick brown fox jumps over the lazy dog")
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+@skipUnless(HAS_REPORTLAB, "reportlab is needed to build the test PDF")
+class PdfplumberPageIterationTests(SimpleTestCase):
+    PAGES = 1000
+    # Traced memory may not grow by more than this between page 100 and the last page.
+    MAX_GROWTH = 8 * 1024 * 1024
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pdf_bytes = _make_pdf(cls.PAGES)
+
+    def test_memory_stays_bounded_over_long_document(self):
+        tracemalloc.start()
+        try:
+            baseline = None
+            seen = 0
+            for page in _iter_pdfplumber_pages(self.pdf_bytes):
+                # page.chars parses the content stream and caches objects, like real extraction
+                self.assertTrue(page.chars)
+                seen += 1
+                if seen == 100:
+                    baseline = tracemalloc.get_traced_memory()[0]
+            final = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(seen, self.PAGES)
+        self.assertLess(final - baseline, self.MAX_GROWTH)
+
+    def test_selected_pages_in_order(self):
+        numbers = [n for n in range(1, self.PAGES + 1, 97)]
+        seen = [page.page_number for page in _iter_pdfplumber_pages(self.pdf_bytes, numbers, chunk_size=3)]
+        self.assertEqual(seen, numbers)
+
+
+class PageSelectionTests(SimpleTestCase):
+    def test_ranges_singles_and_open_ends(self):
+        self.assertEqual(parse_page_ranges("1-3, 7,10-"), [(1, 3), (7, 7), (10, None)])
+
+    def test_open_start_means_from_first_page(self):
+        self.assertEqual(parse_page_ranges("-2"), [(1, 2)])
+        self.assertEqual(_resolve_pages("-2", 5), [0, 1])
+
+    def test_open_end_runs_to_last_page(self):
+        self.assertEqual(_resolve_pages("4-", 5), [3, 4])
+        self.assertEqual(_resolve_pages("2,9-", 5), [1])
+
+    def test_selection_past_the_last_page_matches_nothing(self):
+        with self.assertRaises(PageSelectionError):
+            _resolve_pages("9-", 5)
+
+    def test_overlaps_are_merged_and_sorted(self):
+        self.assertEqual(_resolve_pages("4-5,1,2-4", 10), [0, 1, 2, 3, 4])
+
+    def test_empty_selection_means_all_pages(self):
+        self.assertIsNone(_resolve_pages("  ", 5))
+
+    def test_malformed_selections_are_rejected(self):
+        for spec in ("5-3", "0", "0-2", "a", "1-b", ",", "1--2"):
+            with self.subTest(spec=spec), self.assertRaises(PageSelectionError):
+                parse_page_ranges(spec)
+
+
+class RasterDpiPlanTests(SimpleTestCase):
+    A4 = (595.28, 841.89)
+    A0 = (2383.94, 3370.39)
+
+    def _pixels(self, size, dpi):
+        return (size[0] / 72 * dpi) * (size[1] / 72 * dpi)
+
+    def test_small_request_keeps_requested_dpi(self):
+        self.assertEqual(plan_raster_dpi([self.A4] * 3, [0, 2], 200), {0: 200, 2: 200})
+
+    def test_a0_at_600_dpi_is_capped_per_page(self):
+        plan = plan_raster_dpi([self.A4, self.A0], [0, 1], 600)
+        self.assertEqual(plan[0], 600)
+        self.assertLess(plan[1], 600)
+        self.assertLessEqual(self._pixels(self.A0, plan[1]), _RASTER_MAX_PAGE_PIXELS)
+        self.assertGreater(self._pixels(self.A0, plan[1] + 1), _RASTER_MAX_PAGE_PIXELS)
+
+    def test_request_over_budget_is_scaled_down(self):
+        budget = 100_000_000
+        plan = plan_raster_dpi([self.A4] * 20, list(range(20)), 300, max_request_pixels=budget)
+        self.assertTrue(all(_RASTER_MIN_DPI <= d < 300 for d in plan.values()))
+        self.assertLessEqual(sum(self._pixels(self.A4, d) for d in plan.values()), budget)
+
+    def test_request_over_budget_at_minimum_dpi_raises(self):
+        with self.assertRaises(RasterBudgetExceeded):
+            plan_raster_dpi([self.A0] * 10, list(range(10)), 300, max_request_pixels=10_000_000)
+
+    def test_no_request_budget(self):
+        plan = plan_raster_dpi([self.A4] * 50, list(range(50)), 300, max_request_pixels=None)
+        self.assertEqual(set(plan.values()), {300})
+
+
+@skipUnless(HAS_REPORTLAB and HAS_PDFIUM, "reportlab and pypdfium2 are needed")
+class PdfiumBackendTests(SimpleTestCase):
+    def test_concurrent_renders_from_threads(self):
+        pdf_bytes = _make_pdf(6)
+        backend = get_raster_backend("pdfium")
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: backend.render_arrays(pdf_bytes, 36), range(8)))
+
+        for arrays in results:
+            self.assertEqual(len(arrays), 6)
+            for arr, expected in zip(arrays, results[0]):
+                self.assertEqual(arr.shape, expected.shape)
+                self.assertTrue((arr == expected).all())
+
+
+class ImagesToPdfWriterTests(SimpleTestCase):
+    def _encode(self, mode, size, fmt, color):
+        buf = io.BytesIO()
+        Image.new(mode, size, color).save(buf, format=fmt)
+        buf.seek(0)
+        return buf
+
+    def _pages(self, pdf_bytes):
+        """(mediabox, image stream) per page, read back with pdfminer."""
+        doc = PDFDocument(PDFParser(io.BytesIO(pdf_bytes)))
+        pages = []
+        for page in PDFPage.create_pages(doc):
+            xobjects = resolve1(page.resources["XObject"])
+            pages.append(([round(float(v), 2) for v in page.mediabox], resolve1(xobjects["Im0"])))
+        return pages
+
+    def _decoded_size(self, stream):
+        """(width, height, channels) of the decoded image samples."""
+        data = stream.get_data()
+        if stream.get_any(("F", "Filter")).name == "DCTDecode":
+            img = Image.open(io.BytesIO(data))
+            img.load()
+            return img.width, img.height, len(img.getbands())
+        width, height = stream["Width"], stream["Height"]
+        channels, rest = divmod(len(data), width * height)
+        self.assertEqual(rest, 0)
+        return width, height, channels
+
+    def test_each_input_kind_becomes_a_decodable_page(self):
+        uploads = [
+            self._encode("RGB", (40, 30), "JPEG", (200, 20, 20)),
+            self._encode("L", (20, 10), "PNG", 128),
+            self._encode("RGBA", (16, 16), "PNG", (0, 0, 255, 128)),
+            self._encode("CMYK", (24, 12), "JPEG", (0, 255, 255, 0)),
+        ]
+        pages = self._pages(images_to_pdf_bytes(uploads))
+
+        self.assertEqual(len(pages), 4)
+        expected = [(40, 30, 3), (20, 10, 1), (16, 16, 3), (24, 12, 3)]
+        for (mediabox, stream), (width, height, channels) in zip(pages, expected):
+            # Without a page size the page is the image at 72 dpi.
+            self.assertEqual(mediabox, [0, 0, width, height])
+            self.assertEqual(self._decoded_size(stream), (width, height, channels))
+
+    def test_page_size_turns_page_to_image_orientation(self):
+        uploads = [
+            self._encode("RGB", (300, 100), "JPEG", "white"),
+            self._encode("L", (100, 300), "PNG", 0),
+        ]
+        pages = self._pages(images_to_pdf_bytes(uploads, page_size="A4"))
+
+        self.assertEqual([mediabox for mediabox, _ in pages], [[0, 0, 841.89, 595.28], [0, 0, 595.28, 841.89]])
+
+    def test_unreadable_uploads_are_skipped(self):
+        uploads = [io.BytesIO(b"not an image"), self._encode("RGB", (8, 8), "PNG", "red")]
+        self.assertEqual(len(self._pages(images_to_pdf_bytes(uploads))), 1)
+
+
+class ColorspaceClassificationTests(SimpleTestCase):
+    def _thumb(self, value=255):
+        return np.full((176, 136, 3), value, dtype=np.uint8)
+
+    def test_grey_page_is_l(self):
+        thumb = self._thumb()
+        thumb[20:40, 10:120] = 60  # grey text block
+        self.assertEqual(_classify_colorspace(thumb, set()), "L")
+        self.assertEqual(_classify_colorspace(thumb, {"L"}), "L")
+
+    def test_bilevel_scan_is_1(self):
+        thumb = self._thumb()
+        thumb[20:40, 10:120] = 0
+        self.assertEqual(_classify_colorspace(thumb, {"1"}), "1")
+
+    def test_mixed_images_without_visible_colour_is_l(self):
+        self.assertEqual(_classify_colorspace(self._thumb(), {"1", "RGB"}), "L")
+
+    def test_small_colour_detail_keeps_rgb(self):
+        thumb = self._thumb()
+        thumb[5:7, 5:7] = (200, 30, 30)  # a logo a few thumbnail pixels wide
+        self.assertEqual(_classify_colorspace(thumb, {"1"}), "RGB")
+
+    def test_thin_coloured_line_keeps_rgb(self):
+        thumb = self._thumb()
+        thumb[100, 10:60] = (40, 40, 220)
+        self.assertEqual(_classify_colorspace(thumb, set()), "RGB")
+
+
+class BlankPageDetectionTests(SimpleTestCase):
+    # Letter page at the thumbnail (16 dpi) and confirmation (72 dpi) resolutions
+    THUMB = (176, 136, 3)
+    PAGE = (792, 612, 3)
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def _page(self, shape, value=255, noise=0.0):
+        page = np.full(shape, float(value))
+        if noise:
+            page += self.rng.normal(0, noise, shape[:2])[:, :, None]
+        return np.clip(page, 0, 255).astype(np.uint8)
+
+    def test_clean_white_is_blank(self):
+        self.assertTrue(_is_blank_thumbnail(self._page(self.THUMB)))
+        self.assertFalse(_has_visible_marks(self._page(self.PAGE)))
+
+    def test_scanner_noise_is_blank(self):
+        self.assertTrue(_is_blank_thumbnail(self._page(self.THUMB, 245, noise=6)))
+        self.assertFalse(_has_visible_marks(self._page(self.PAGE, 245, noise=6)))
+
+    def test_scattered_dust_is_blank(self):
+        page = self._page(self.PAGE, 250)
+        ys = self.rng.integers(0, self.PAGE[0], 40)
+        xs = self.rng.integers(0, self.PAGE[1], 40)
+        page[ys, xs] = 0
+        self.assertFalse(_has_visible_marks(page))
+
+    def test_off_white_paper_is_blank(self):
+        self.assertTrue(_is_blank_thumbnail(self._page(self.THUMB, 228, noise=3)))
+        self.assertFalse(_has_visible_marks(self._page(self.PAGE, 228, noise=3)))
+
+    def test_text_page_is_not_blank(self):
+        thumb = self._page(self.THUMB)
+        for row in range(20, 160, 4):
+            thumb[row:row + 2, 12:124] = 90
+        self.assertFalse(_is_blank_thumbnail(thumb))
+
+    def test_sparse_text_line_survives_confirmation(self):
+        # "Page 4" in 10pt text: a few light pixels at 16 dpi ...
+        thumb = self._page(self.THUMB)
+        thumb[166, 60:66] = 200
+        self.assertTrue(_is_blank_thumbnail(thumb))
+        # ... but solid strokes at 72 dpi.
+        page = self._page(self.PAGE)
+        for x in range(280, 330, 8):
+            page[740:750, x:x + 2] = 20
+        self.assertTrue(_has_visible_marks(page))
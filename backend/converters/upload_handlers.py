@@ -0,0 +1,148 @@
+# converters/upload_handlers.py
+# Upload handlers that start converting while the request body is still arriving.
+
+import logging
+import os
+from io import BytesIO
+from typing import Optional
+
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+from .utils import ImagesToPdfPipeline
+
+logger = logging.getLogger(__name__)
+
+# Larger parts are left to Django's own handlers (disk spooling) and converted after the upload
+_PIPELINE_MAX_FILE_BYTES = int(os.environ.get("IMAGES_PIPELINE_MAX_FILE_BYTES", str(64 * 1024 * 1024)))
+
+
+class ImagesToPdfUploadHandler(FileUploadHandler):
+    """
+    Feeds each "files" part of an images-to-pdf upload into an
+    ImagesToPdfPipeline as soon as that part has been received, so images
+    are decoded and encoded while later ones are still on the wire.
+
+    The handler keeps the only copy of each "files" part: later handlers
+    never see its chunks, and the part reaches request.FILES (for
+    validation and the non-pipelined fallback) as an upload backed by the
+    same bytes. A part that grows past _PIPELINE_MAX_FILE_BYTES is spilled
+    to a temporary file instead. Form fields are not visible to
+    upload handlers, so page_size / dpi are taken from the query string;
+    the view falls back to converting request.FILES when the form asks
+    for something else.
+    """
+
+    # Form field whose parts are pipelined (FileUploadHandler.field_name is the current part's)
+    images_field = "files"
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.pipeline: Optional[ImagesToPdfPipeline] = None
+        self.submitted = 0
+        self.failed = False
+        self._buffer: Optional[BytesIO] = None
+        # The current "files" part once it is too large to pipeline
+        self._spilled: Optional[TemporaryUploadedFile] = None
+
+    def _options(self):
+        params = self.request.GET if self.request is not None else {}
+        page_size = params.get("page_size") or None
+        dpi = int(params["dpi"]) if params.get("dpi") else None
+        return page_size, dpi
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self._buffer = self._spilled = None
+        if field_name != self.images_field:
+            return
+        self._buffer = BytesIO()
+        if self.failed:
+            return
+        if self.pipeline is None:
+            try:
+                page_size, dpi = self._options()
+                self.pipeline = ImagesToPdfPipeline(page_size=page_size, dpi=dpi)
+            except ValueError:
+                # Bad options: leave it to the view's validation.
+                self.failed = True
+
+    def receive_data_chunk(self, raw_data, start):
+        if self._spilled is not None:
+            self._spilled.write(raw_data)
+            return None
+        if self._buffer is None:
+            # Not ours: the next handler stores it.
+            return raw_data
+        if self._buffer.tell() + len(raw_data) > _PIPELINE_MAX_FILE_BYTES:
+            logger.info("Image part over %d bytes; converting after the upload instead.", _PIPELINE_MAX_FILE_BYTES)
+            self._spill()
+            self._spilled.write(raw_data)
+        else:
+            self._buffer.write(raw_data)
+        return None
+
+    def _spill(self) -> None:
+        """Move the current part to a temporary file and stop pipelining."""
+        buffer, self._buffer = self._buffer, None
+        self._spilled = TemporaryUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self._spilled.write(buffer.getbuffer())
+        self.discard()
+
+    def file_complete(self, file_size):
+        if self._spilled is not None:
+            upload, self._spilled = self._spilled, None
+            upload.seek(0)
+            upload.size = file_size
+            return upload
+        if self._buffer is None:
+            # The next handler produces the UploadedFile.
+            return None
+
+        data, self._buffer = self._buffer.getvalue(), None
+        if not self.failed:
+            try:
+                self.pipeline.submit(data)
+                self.submitted += 1
+            except Exception:
+                logger.exception("Pipelined image conversion failed; converting after the upload instead.")
+                self.discard()
+        # BytesIO over the same bytes object: no second copy of the image.
+        return InMemoryUploadedFile(
+            file=BytesIO(data),
+            field_name=self.field_name,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        if self._spilled is not None:
+            self._spilled.close()
+            self._spilled = None
+        self.discard()
+
+    def take_pipeline(self, page_size: Optional[str], dpi: Optional[int], count: int) -> Optional[ImagesToPdfPipeline]:
+        """
+        The pipeline, if it converted exactly the count images the view is
+        about to convert with the same options; otherwise None (and any
+        pipeline is discarded). The caller then owns the returned pipeline.
+        """
+        pipeline, self.pipeline = self.pipeline, None
+        if pipeline is None:
+            return None
+        same_options = (pipeline.page_size or "").upper() == (page_size or "").upper() and pipeline.dpi == dpi
+        if self.failed or not same_options or self.submitted != count:
+            pipeline.close()
+            return None
+        return pipeline
+
+    def discard(self) -> None:
+        """Stop pipelining for this request and drop any partial output."""
+        self.failed = True
+        self._buffer = None
+        if self.pipeline is not None:
+            self.pipeline.close()
+            self.pipeline = None
@@ -10,6 +10,7 @@ from .views import (
     ConvertExcelToPdfView,
     ConvertPptxToPdfView,
     ConvertTxtToPdfView,
+    ScratchUsageView,
 )
 
 urlpatterns = [
@@ -23,5 +24,6 @@ urlpatterns = [
     path('excel-to-pdf/', ConvertExcelToPdfView.as_view(), name='convert-excel-to-pdf'),
     path('pptx-to-pdf/', ConvertPptxToPdfView.as_view(), name='convert-pptx-to-pdf'),
     path('txt-to-pdf/', ConvertTxtToPdfView.as_view(), name='convert-txt-to-pdf'),
+    path('scratch-usage/', ScratchUsageView.as_view(), name='scratch-usage'),
 
 ]
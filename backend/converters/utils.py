@@ -2,31 +2,58 @@
 # Conversion utilities for PDF <-> other formats (pptx, docx, xlsx, images, etc.)
 
 # === Standard Library Imports ===
+import abc
+import codecs
+import csv
+import hashlib
+import functools
 import io
+import itertools
+import json
 import os
 import platform
+import re
 import shutil
 import subprocess
 import tempfile
+import threading
 import zipfile
+import zlib
 import logging
+import math
+import multiprocessing
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait as wait_futures
 from io import BytesIO
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 # === Third-Party Libraries ===
+import numpy as np
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 import pdfplumber
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_path, pdfinfo_from_bytes
 from PIL import Image, UnidentifiedImageError
 import pytesseract
 
 # PDFMiner (text extraction)
-from pdfminer.high_level import extract_text as pdfminer_extract_text
 from pdfminer.layout import LAParams
+from pdfminer.converter import TextConverter
+from pdfminer.pdfdevice import PDFTextDevice
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import PDFStream, resolve1
+from pdfminer.psparser import LIT
 
 # python-pptx
 from pptx import Presentation
-from pptx.util import Inches, Pt, Cm, Length
+from pptx.dml.color import RGBColor
+from pptx.enum.shapes import MSO_CONNECTOR, MSO_SHAPE
+from pptx.enum.text import MSO_AUTO_SIZE
+from pptx.util import Inches, Pt, Cm, Length, Emu
 
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
@@ -50,6 +77,20 @@ try:
 except Exception:
     HAS_REPORTLAB = False
 
+# Optional: pypdfium2 (in-process rasterization backend)
+try:
+    import pypdfium2 as pdfium
+    HAS_PDFIUM = True
+except Exception:
+    HAS_PDFIUM = False
+
+# Optional: pyarrow (Parquet output for extracted tables)
+try:
+    import pyarrow  # noqa: F401  (pandas.to_parquet engine)
+    HAS_PYARROW = True
+except Exception:
+    HAS_PYARROW = False
+
 # Optional: pdf2docx (PDF -> DOCX)
 try:
     from pdf2docx import Converter
@@ -58,10 +99,148 @@ except Exception:
     HAS_PDF2DOCX = False
 
 
+from .scratch import scratch
+
 logger = logging.getLogger(__name__)
 
 # Configuration
-_KEEP_TMP_ON_ERROR = True
+
+# OCR result cache (set OCR_CACHE_MAX_BYTES=0 to disable)
+_OCR_CACHE_DIR = os.environ.get(
+    "OCR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "pdfapp_ocr_cache")
+)
+_OCR_CACHE_MAX_BYTES = int(os.environ.get("OCR_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Parsed-document artifacts (page sizes, text layers, tables, ...) keyed by document hash
+# (set ARTIFACT_CACHE_MAX_BYTES=0 to disable)
+_ARTIFACT_CACHE_DIR = os.environ.get(
+    "ARTIFACT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "pdfapp_artifact_cache")
+)
+_ARTIFACT_CACHE_MAX_BYTES = int(os.environ.get("ARTIFACT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+_ARTIFACT_VERSION = 3  # bump when the shape or meaning of a cached artifact changes
+# Per-page artifacts (texts, tables) are cached in chunks of this many pages, written back as
+# each chunk is streamed
+_PAGE_CACHE_CHUNK_PAGES = 50
+
+# Rasterization budget: pages are rendered at a lower DPI rather than exceed these
+_RASTER_MAX_PAGE_PIXELS = int(os.environ.get("RASTER_MAX_PAGE_PIXELS", str(40_000_000)))
+_RASTER_MAX_REQUEST_PIXELS = int(os.environ.get("RASTER_MAX_REQUEST_PIXELS", str(600_000_000)))
+_RASTER_MIN_DPI = 36
+# "poppler" (pdf2image / pdftoppm subprocess) or "pdfium" (in-process, needs pypdfium2)
+_DEFAULT_RASTER_BACKEND = os.environ.get("PDF_RASTER_BACKEND", "poppler")
+_DEFAULT_PAGE_SIZE = (612.0, 792.0)  # US Letter in points, used when page boxes can't be read
+# PDFium is not thread-safe: every pdfium call in the process is made under this lock
+_PDFIUM_LOCK = threading.RLock()
+_JPEG_POLL_SECONDS = 0.05  # how often a running pdftoppm's output folder is checked for finished pages
+
+# Colourspace-aware rendering: grey / bilevel pages are rendered as "L" / "1" instead of RGB
+_DETECT_COLORSPACE = os.environ.get("RASTER_DETECT_COLORSPACE", "1").lower() in ("1", "true", "yes")
+_THUMBNAIL_DPI = 16
+_GRAY_TOLERANCE = 24  # max channel spread (0-255) still considered grey
+
+# Blank-page handling: "keep" renders them as usual, "skip" drops them,
+# "placeholder" emits a fixed cheap output (white JPEG, empty slide, empty text)
+BLANK_KEEP = "keep"
+BLANK_SKIP = "skip"
+BLANK_PLACEHOLDER = "placeholder"
+BLANK_PAGE_MODES = (BLANK_KEEP, BLANK_SKIP, BLANK_PLACEHOLDER)
+_BLANK_INK_DELTA = 40     # how much darker than the background a pixel must be to count as ink
+_BLANK_MAX_INK = 0.001    # max fraction of ink pixels on a blank page
+_BLANK_MAX_STDDEV = 12.0
+# Pages that look blank on the thumbnail are confirmed at this DPI, where a short line of
+# small text is a few dozen ink pixels; this many clustered ones mean the page isn't blank
+_BLANK_CONFIRM_DPI = 72
+_BLANK_MIN_MARK_PIXELS = 12
+
+# TXT -> PDF: input is decoded in chunks of this size; output spools to scratch disk past the limit
+_TXT_CHUNK_BYTES = 1024 * 1024
+_TXT_PDF_SPOOL_BYTES = 16 * 1024 * 1024
+
+# Images -> PDF output is kept in memory up to this size, then spooled to scratch disk
+_IMAGES_PDF_SPOOL_BYTES = 16 * 1024 * 1024
+# Page-fit downsampling: images larger than page size x dpi are decoded reduced and resampled
+_IMAGE_PAGE_SIZES = {"A4": (595.28, 841.89), "LETTER": (612.0, 792.0)}
+_IMAGES_JPEG_QUALITY = 85
+_IMAGES_WORKERS = int(os.environ.get("IMAGES_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# PDF -> TXT page routing: fast (content-order) text, layout-analysed text, or OCR
+_ROUTE_FAST = "fast"
+_ROUTE_TEXT = "text"
+_ROUTE_OCR = "ocr"
+_MIN_TEXT_GLYPHS = 20      # fewer glyphs than this and the page is treated as having no text layer
+_MIN_OCR_PATHS = 200       # outlined text shows up as many filled paths instead of glyphs
+# In balanced mode, plain prose pages skip layout analysis: one font, no images or
+# drawn paths (tables, rules) and no more glyphs than a single-column page holds
+_FAST_MAX_FONTS = 1
+_FAST_MAX_GLYPHS = 3000
+
+# PDF -> TXT extraction tiers
+TXT_MODE_FAST = "fast"
+TXT_MODE_BALANCED = "balanced"
+TXT_MODE_ACCURATE = "accurate"
+TXT_MODES = (TXT_MODE_FAST, TXT_MODE_BALANCED, TXT_MODE_ACCURATE)
+
+_ACCURATE_LAPARAMS = LAParams(char_margin=2.0, line_margin=0.5, word_margin=0.1, boxes_flow=0.5)
+# boxes_flow=None skips the hierarchical text-box ordering, the costly part of layout analysis
+_BALANCED_LAPARAMS = LAParams(char_margin=2.0, line_margin=0.5, word_margin=0.1, boxes_flow=None)
+
+# PDF -> PPTX slide image codec: "auto" picks JPEG for photographic pages and PNG otherwise
+PPTX_CODEC_AUTO = "auto"
+PPTX_CODEC_PNG = "png"
+PPTX_CODEC_JPEG = "jpeg"
+PPTX_CODECS = (PPTX_CODEC_AUTO, PPTX_CODEC_PNG, PPTX_CODEC_JPEG)
+_PPTX_JPEG_QUALITY = int(os.environ.get("PPTX_JPEG_QUALITY", "85"))
+_PPTX_PNG_COMPRESS_LEVEL = 6
+_PPTX_ENCODE_WORKERS = int(os.environ.get("PPTX_ENCODE_WORKERS", str(min(4, os.cpu_count() or 1))))
+_PHOTO_SAMPLE_SIZE = 256   # pages are sampled at this size when guessing the codec
+_PHOTO_MIN_COLORS = 1024   # more distinct colours than this in the sample and the page is photographic
+
+# PDF -> PPTX slide content: "image" is one full-page picture per slide, "text" places
+# native text boxes and shapes and only rasterizes images and curves
+PPTX_LAYOUT_IMAGE = "image"
+PPTX_LAYOUT_TEXT = "text"
+PPTX_LAYOUTS = (PPTX_LAYOUT_IMAGE, PPTX_LAYOUT_TEXT)
+_EMU_PER_PT = 12700
+_TEXT_LINE_TOLERANCE = 3.0   # pt; words whose tops differ by less share a line
+_TEXT_COLUMN_GAP = 3.0       # in font sizes; a wider gap starts a new text box on the same line
+_MAX_GRAPHIC_BOXES = 500     # above this many images / curves a page gets one graphics region
+_MAX_GRAPHIC_REGIONS = 32
+
+# PDF -> DOCX: pdf2docx can split contiguous page ranges across processes
+_DOCX_CPU_COUNT = int(os.environ.get("PDF2DOCX_CPU_COUNT", str(os.cpu_count() or 1)))
+_DOCX_PARALLEL_MIN_PAGES = 8   # smaller jobs convert faster in one process
+
+# pdfplumber page iteration: the document is reopened every N pages so parsed
+# objects cached by pdfplumber / pdfminer do not accumulate over long PDFs
+_PLUMBER_REOPEN_PAGES = int(os.environ.get("PDFPLUMBER_REOPEN_PAGES", "50"))
+
+# PDF -> EXCEL: table finding is pure Python, so page chunks go to worker processes
+_TABLE_WORKERS = int(os.environ.get("PDF_TABLE_WORKERS", str(os.cpu_count() or 1)))
+_TABLE_PAGES_PER_TASK = 8
+_TABLE_PARALLEL_MIN_PAGES = 16   # below this, process start-up costs more than it saves
+# Never fork workers from a threaded server (table workers, pdf2docx): a forked child can
+# inherit locks held by other threads
+_WORKER_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+# Table-presence prefilter: pages scoring below the threshold (0..1) skip extract_tables(); 0 disables it
+_TABLE_SCORE_THRESHOLD = float(os.environ.get("PDF_TABLE_SCORE_THRESHOLD", "0.3"))
+_TABLE_MIN_EDGE = 10.0     # pt; shorter ruling edges are ignored (underlines, bullets)
+_TABLE_MIN_ROWS = 3        # rows that must share column starts before alignment counts
+_TABLE_X_BIN = 3.0         # pt; column starts are compared in bins this wide
+
+LITERAL_IMAGE = LIT("Image")
+LITERAL_FORM = LIT("Form")
+LITERAL_DEVICE_GRAY = LIT("DeviceGray")
+LITERAL_CAL_GRAY = LIT("CalGray")
+LITERAL_ICC_BASED = LIT("ICCBased")
+LITERAL_CCITTFAX = LIT("CCITTFaxDecode")
+LITERAL_JBIG2 = LIT("JBIG2Decode")
+
+# Content-stream scanning (text-layer census)
+_PDF_TEXT_BLOCK_RE = re.compile(rb"\bBT\b(.*?)\bET\b", re.S)
+_PDF_STRING_RE = re.compile(rb"\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>")
+_PDF_DO_RE = re.compile(rb"/([^\s/\[\]()<>{}%]+)\s+Do\b")
+_PDF_INLINE_IMAGE_RE = re.compile(rb"\bBI\b")
+_PDF_FILL_RE = re.compile(rb"\b(?:f\*?|F|B\*?|b\*?)\s")
 
 # -------------------------
 # TXT -> PDF
@@ -71,65 +250,109 @@ _KEEP_TMP_ON_ERROR = True
 # TXT -> PDF (Improved, fixes black squares)
 # -------------------------
 
-def normalize_unicode_spaces(text: str) -> str:
-    # Replace ONLY unicode special spaces, keep newlines and tabs as is
-    special_spaces = [
+# Unicode special spaces -> plain space; newlines and tabs are kept
+_UNICODE_SPACES_TABLE = str.maketrans({
+    sp: " " for sp in (
         "\u00A0",  # NO-BREAK SPACE
         "\u2000", "\u2001", "\u2002", "\u2003", "\u2004", "\u2005",
         "\u2006", "\u2007", "\u2008", "\u2009", "\u200A",
         "\u202F", "\u205F", "\u3000",
-    ]
-    for sp in special_spaces:
-        text = text.replace(sp, " ")
-    return text
-
-
-def txt_to_pdf_bytes(file_obj, page_size=A4, font_size=12, margin=40):
-    try:
-        file_obj.seek(0)
-    except:
-        pass
+    )
+})
+# Rendering also turns tabs into 4 spaces (fixes black squares)
+_TXT_RENDER_TABLE = {**_UNICODE_SPACES_TABLE, ord("\t"): "    "}
 
-    raw = file_obj.read()
-    try:
-        text = raw.decode("utf-8")
-    except:
-        text = raw.decode("latin-1")
 
-    # Normalize only special unicode spaces
-    text = normalize_unicode_spaces(text)
+def normalize_unicode_spaces(text: str) -> str:
+    # Replace ONLY unicode special spaces, keep newlines and tabs as is
+    return text.translate(_UNICODE_SPACES_TABLE)
 
-    # Convert tabs → spaces (fixes black squares)
-    text = text.replace("\t", "    ")  # 4 spaces (change to 8 if you want)
 
-    # Register Unicode monospace font
+def _iter_txt_lines(file_obj, encoding: str, chunk_size: int = _TXT_CHUNK_BYTES):
+    """
+    Yield the lines of a text upload, decoded and normalized chunk by chunk.
+    Splits on "\n" only, like str.split("\n") on the whole text would.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    tail = ""
+    while True:
+        chunk = file_obj.read(chunk_size)
+        lines = (tail + decoder.decode(chunk, final=not chunk).translate(_TXT_RENDER_TABLE)).split("\n")
+        tail = lines.pop()
+        yield from lines
+        if not chunk:
+            break
+    yield tail
+
+
+def _register_txt_font() -> None:
     from reportlab.pdfbase import pdfmetrics
     from reportlab.pdfbase.ttfonts import TTFont
-    pdfmetrics.registerFont(
-        TTFont("DejaVuMono", "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf")
-    )
+    if "DejaVuMono" not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont("DejaVuMono", "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf")
+        )
 
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=page_size)
-    pdf.setFont("DejaVuMono", font_size)
 
+def _render_txt_pdf(file_obj, out, encoding: str, page_size, font_size: int, margin: float) -> None:
     width, height = page_size
-    x = margin
-    y = height - margin
     line_height = font_size * 1.35
-
-    for line in text.split("\n"):
-        if y < margin:
+    top = height - margin
+    # lines drawn at top, top - line_height, ... while still above the bottom margin
+    lines_per_page = max(1, int((top - margin) // line_height) + 1)
+
+    pdf = canvas.Canvas(out, pagesize=page_size, pageCompression=1)
+    text = None
+    on_page = 0
+    for line in _iter_txt_lines(file_obj, encoding):
+        if on_page == lines_per_page:
+            pdf.drawText(text)
             pdf.showPage()
-            pdf.setFont("DejaVuMono", font_size)
-            y = height - margin
+            text, on_page = None, 0
+        if text is None:
+            text = pdf.beginText(margin, top)
+            text.setFont("DejaVuMono", font_size, leading=line_height)
+        text.textLine(line)
+        on_page += 1
+    if text is not None:
+        pdf.drawText(text)
+    pdf.save()
 
-        pdf.drawString(x, y, line)
-        y -= line_height
 
-    pdf.save()
-    buffer.seek(0)
-    return buffer.read()
+def txt_to_pdf_file(file_obj, page_size=A4, font_size=12, margin=40):
+    """
+    Render a text upload to PDF, written into a spooled temp file (returned
+    at offset 0). The input is decoded incrementally as UTF-8; if it turns
+    out not to be, rendering starts over as latin-1.
+
+    Only the input side is bounded: ReportLab keeps every rendered page
+    (compressed) until save(), so memory still grows with the page count.
+    """
+    _register_txt_font()
+    out = scratch.output_file(suffix=".pdf", spool_bytes=_TXT_PDF_SPOOL_BYTES)
+    try:
+        for encoding in ("utf-8", "latin-1"):
+            try:
+                file_obj.seek(0)
+            except Exception:
+                pass
+            out.seek(0)
+            out.truncate()
+            try:
+                _render_txt_pdf(file_obj, out, encoding, page_size, font_size, margin)
+                break
+            except UnicodeDecodeError:
+                logger.info("TXT upload is not valid UTF-8; rendering as latin-1.")
+    except Exception:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+
+def txt_to_pdf_bytes(file_obj, page_size=A4, font_size=12, margin=40):
+    with txt_to_pdf_file(file_obj, page_size=page_size, font_size=font_size, margin=margin) as f:
+        return f.read()
 
 
 # -------------------------
@@ -280,27 +503,23 @@ def docx_to_pdf_bytes(file_obj):
       2. Fallback: extract text via python-docx and write PDF via reportlab.
     """
     from io import BytesIO
-    import tempfile
     import os
 
     # ---- Try docx2pdf first (if installed & OS supports MS Word)
     try:
         import docx2pdf
-        tmp_dir = tempfile.mkdtemp(prefix="docx2pdf_")
-        in_path = os.path.join(tmp_dir, "input.docx")
-        out_path = os.path.join(tmp_dir, "output.pdf")
-
-        with open(in_path, "wb") as f:
-            f.write(file_obj.read())
+        with scratch.job("docx2pdf") as job:
+            in_path = job.write_bytes("input.docx", file_obj.read())
+            out_path = job.path_for("output.pdf")
 
-        try:
-            docx2pdf.convert(in_path, out_path)
-        except Exception:
-            out_path = None
+            try:
+                docx2pdf.convert(in_path, out_path)
+            except Exception:
+                out_path = None
 
-        if out_path and os.path.exists(out_path):
-            with open(out_path, "rb") as f:
-                return f.read()
+            if out_path and os.path.exists(out_path):
+                with open(out_path, "rb") as f:
+                    return f.read()
     except Exception:
         pass  # docx2pdf not available → fallback
 
@@ -426,99 +645,1385 @@ def xlsx_to_pdf_bytes(file_obj, page_size=A4, backend: str = "soffice", timeout:
 # Images -> PDF
 # -------------------------
 
-def images_to_pdf_bytes(file_objs: list) -> bytes:
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class _PdfImageWriter:
     """
-    Convert a list of uploaded image file-like objects to a single multi-page PDF.
-    Returns PDF bytes.
+    Minimal PDF writer for image-only documents: one page per image, each
+    written (image XObject, content stream, page) as soon as it is added.
+    Objects 1 and 2 (catalog and page tree) are written last, since only
+    then are the pages known; the xref table maps them either way.
     """
-    pil_images = []
-    for f in file_objs:
-        if f is None:
-            continue
 
+    def __init__(self, out):
+        self.out = out
+        self.pos = 0
+        self.offsets: Dict[int, int] = {}
+        self.page_refs: List[int] = []
+        self._next = 3
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes) -> None:
+        self.out.write(data)
+        self.pos += len(data)
+
+    def _alloc(self) -> int:
+        num = self._next
+        self._next += 1
+        return num
+
+    def _object(self, num: int, body: str, stream: Optional[bytes] = None) -> None:
+        self.offsets[num] = self.pos
+        self._write(f"{num} 0 obj\n{body}".encode("latin-1"))
+        if stream is not None:
+            self._write(b"\nstream\n")
+            self._write(stream)
+            self._write(b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def add_image_page(
+        self,
+        image_dict: str,
+        data: bytes,
+        width_px: int,
+        height_px: int,
+        page_w: float,
+        page_h: float,
+        box: Optional[Tuple[float, float, float, float]] = None,
+    ) -> None:
+        """box is (x, y, width, height) of the image on the page in points; default: the full page."""
+        x, y, draw_w, draw_h = box or (0.0, 0.0, page_w, page_h)
+        img, content, page = self._alloc(), self._alloc(), self._alloc()
+        self._object(
+            img,
+            f"<< /Type /XObject /Subtype /Image /Width {width_px} /Height {height_px} {image_dict} /Length {len(data)} >>",
+            data,
+        )
+        ops = f"q {draw_w:.2f} 0 0 {draw_h:.2f} {x:.2f} {y:.2f} cm /Im0 Do Q".encode("latin-1")
+        self._object(content, f"<< /Length {len(ops)} >>", ops)
+        self._object(
+            page,
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_w:.2f} {page_h:.2f}] "
+            f"/Resources << /XObject << /Im0 {img} 0 R >> >> /Contents {content} 0 R >>",
+        )
+        self.page_refs.append(page)
+
+    def close(self) -> None:
+        kids = " ".join(f"{n} 0 R" for n in self.page_refs)
+        self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_refs)} >>")
+        self._object(1, "<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self.pos
+        lines = [f"xref\n0 {self._next}\n", "0000000000 65535 f \n"]
+        lines += [f"{self.offsets[n]:010d} 00000 n \n" for n in range(1, self._next)]
+        lines.append(f"trailer\n<< /Size {self._next} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n")
+        self._write("".join(lines).encode("latin-1"))
+
+
+def _png_passthrough(data: bytes):
+    """
+    (image_dict, stream, width, height) embedding the PNG's IDAT data as-is
+    (PDF's Flate predictor 15 is PNG filtering), or None when the PNG needs
+    transcoding: interlaced, 16-bit, or with an alpha channel.
+    """
+    pos = 8
+    ihdr = plte = None
+    idat = []
+    while pos + 8 <= len(data):
+        length = int.from_bytes(data[pos:pos + 4], "big")
+        ctype = data[pos + 4:pos + 8]
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if ctype == b"IHDR":
+            ihdr = chunk
+        elif ctype == b"PLTE":
+            plte = chunk
+        elif ctype == b"IDAT":
+            idat.append(chunk)
+        elif ctype == b"IEND":
+            break
+    if not ihdr or len(ihdr) < 13 or not idat:
+        return None
+
+    width = int.from_bytes(ihdr[0:4], "big")
+    height = int.from_bytes(ihdr[4:8], "big")
+    depth, color_type, interlace = ihdr[8], ihdr[9], ihdr[12]
+    if interlace:
+        return None
+    if color_type == 0 and depth in (1, 2, 4, 8):
+        colors, colorspace = 1, "/DeviceGray"
+    elif color_type == 2 and depth == 8:
+        colors, colorspace = 3, "/DeviceRGB"
+    elif color_type == 3 and depth in (1, 2, 4, 8) and plte:
+        colors, colorspace = 1, f"[/Indexed /DeviceRGB {len(plte) // 3 - 1} <{plte.hex()}>]"
+    else:
+        return None
+
+    image_dict = (
+        f"/ColorSpace {colorspace} /BitsPerComponent {depth} /Filter /FlateDecode "
+        f"/DecodeParms << /Predictor 15 /Colors {colors} /BitsPerComponent {depth} /Columns {width} >>"
+    )
+    return image_dict, b"".join(idat), width, height
+
+
+def _transcode_image_xobject(img: Image.Image):
+    """Fallback: decode and store as Flate-compressed 8-bit grey or RGB samples."""
+    if img.mode in ("1", "L", "LA", "I;16"):
+        img = img.convert("L")
+        colorspace = "/DeviceGray"
+    else:
+        img = img.convert("RGB")
+        colorspace = "/DeviceRGB"
+    image_dict = f"/ColorSpace {colorspace} /BitsPerComponent 8 /Filter /FlateDecode"
+    return image_dict, zlib.compress(img.tobytes(), 6), img.width, img.height
+
+
+def _image_xobject(data: bytes):
+    """
+    (image_dict, stream, width, height) for one uploaded image. Baseline and
+    progressive JPEGs in RGB or grey are embedded byte for byte (DCTDecode);
+    CMYK JPEGs are transcoded, because Adobe CMYK JPEGs are often stored
+    inverted. Raises the PIL error for data that is not an image.
+    """
+    if data[:3] == b"\xff\xd8\xff":
+        # Image.open only parses the header here; nothing is decoded.
+        img = Image.open(BytesIO(data))
+        if img.mode in ("RGB", "L"):
+            colorspace = "/DeviceRGB" if img.mode == "RGB" else "/DeviceGray"
+            return f"/ColorSpace {colorspace} /BitsPerComponent 8 /Filter /DCTDecode", data, img.width, img.height
+        return _transcode_image_xobject(img)
+
+    if data[:8] == _PNG_SIGNATURE:
+        embedded = _png_passthrough(data)
+        if embedded is not None:
+            return embedded
+
+    return _transcode_image_xobject(Image.open(BytesIO(data)))
+
+
+def _fit_on_page(width: int, height: int, page_size: Optional[Tuple[float, float]]):
+    """
+    (page_w, page_h, box) for an image of width x height pixels. Without a
+    page size the page is the image at 72 dpi; otherwise the page is turned
+    to match the image's orientation and the image is centred to fit.
+    """
+    if page_size is None:
+        return float(width), float(height), (0.0, 0.0, float(width), float(height))
+    page_w, page_h = page_size
+    if (width > height) != (page_w > page_h):
+        page_w, page_h = page_h, page_w
+    scale = min(page_w / width, page_h / height)
+    draw_w, draw_h = width * scale, height * scale
+    return page_w, page_h, ((page_w - draw_w) / 2, (page_h - draw_h) / 2, draw_w, draw_h)
+
+
+def _downsampled_xobject(data: bytes, target: Tuple[int, int]):
+    """
+    Decode at reduced size and resample to target pixels. JPEG draft mode
+    makes libjpeg decode at 1/2, 1/4 or 1/8 scale (never below target), so
+    full-resolution pixels are never materialised; the result is JPEG again.
+    """
+    img = Image.open(BytesIO(data))
+    if img.format == "JPEG":
+        img.draft("L" if img.mode == "L" else "RGB", target)
+        img = img.convert("L" if img.mode == "L" else "RGB")
+        img = img.resize(target, Image.LANCZOS)
+        buf = BytesIO()
+        img.save(buf, format="JPEG", quality=_IMAGES_JPEG_QUALITY)
+        colorspace = "/DeviceRGB" if img.mode == "RGB" else "/DeviceGray"
+        return f"/ColorSpace {colorspace} /BitsPerComponent 8 /Filter /DCTDecode", buf.getvalue(), img.width, img.height
+
+    if img.mode not in ("L", "RGB"):
+        img = img.convert("L" if img.mode in ("1", "LA", "I;16") else "RGB")
+    return _transcode_image_xobject(img.resize(target, Image.LANCZOS))
+
+
+def _prepare_image_page(f, page_size: Optional[Tuple[float, float]] = None, dpi: Optional[int] = None):
+    """
+    Read one upload and build its page: (image_dict, stream, width, height,
+    page_w, page_h, box), or None if it is not a usable image. Runs in the
+    worker pool; images already within page size x dpi are embedded as-is.
+    """
+    try:
         if isinstance(f, Image.Image):
-            pil_images.append(f.convert("RGB"))
-            continue
+            xobject = _transcode_image_xobject(f)
+            return (*xobject, *_fit_on_page(xobject[2], xobject[3], page_size))
 
-        try:
+        if isinstance(f, (bytes, bytearray)):
+            content = bytes(f)
+        else:
             try:
                 f.seek(0)
             except Exception:
                 pass
+            content = f.read()
+        if not content:
+            return None
+
+        # Header only: size without decoding.
+        width, height = Image.open(BytesIO(content)).size
+        page_w, page_h, box = _fit_on_page(width, height, page_size)
+        if dpi:
+            target = (max(1, math.ceil(box[2] * dpi / 72)), max(1, math.ceil(box[3] * dpi / 72)))
+            if width > target[0] and height > target[1]:
+                return (*_downsampled_xobject(content, target), page_w, page_h, box)
+        return (*_image_xobject(content), page_w, page_h, box)
+    except UnidentifiedImageError:
+        return None
+    except Exception:
+        return None
+
+
+def _image_page_dims(page_size: Optional[str]) -> Optional[Tuple[float, float]]:
+    if page_size is None:
+        return None
+    if page_size.upper() not in _IMAGE_PAGE_SIZES:
+        raise ValueError(f"Unknown page size '{page_size}'.")
+    return _IMAGE_PAGE_SIZES[page_size.upper()]
+
+
+class ImagesToPdfPipeline:
+    """
+    Incremental images -> PDF. Each submitted image is prepared in a thread
+    pool (Pillow releases the GIL while decoding, resampling and encoding)
+    and finished pages are written in submission order as soon as they are
+    ready, so work can start before the last image has even arrived. At
+    most 2 x workers images are in flight; submit() waits beyond that.
+
+        pipeline = ImagesToPdfPipeline(page_size="A4", dpi=150)
+        for f in uploads:
+            pipeline.submit(f)
+        pdf_file = pipeline.finish()
+    """
+
+    def __init__(self, page_size: Optional[str] = None, dpi: Optional[int] = None, workers: Optional[int] = None):
+        self.page_size = page_size
+        self.dpi = dpi
+        self._page_dims = _image_page_dims(page_size)
+        self._workers = max(1, workers or _IMAGES_WORKERS)
+        self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="images2pdf")
+        self._pending = deque()
+        self._out = scratch.output_file(suffix=".pdf", spool_bytes=_IMAGES_PDF_SPOOL_BYTES)
+        self._writer = _PdfImageWriter(self._out)
+
+    def submit(self, f) -> None:
+        """Queue one image (bytes, file-like object or PIL image); None is ignored."""
+        if f is None:
+            return
+        self._pending.append(self._pool.submit(_prepare_image_page, f, self._page_dims, self.dpi))
+        self._drain(block=len(self._pending) >= 2 * self._workers)
+
+    def _drain(self, block: bool = False) -> None:
+        # Write pages from the head of the queue; only block for the oldest when asked to.
+        while self._pending and (block or self._pending[0].done()):
+            prepared = self._pending.popleft().result()
+            block = False
+            if prepared is not None:
+                image_dict, stream, width, height, page_w, page_h, box = prepared
+                self._writer.add_image_page(image_dict, stream, width, height, page_w, page_h, box)
+
+    @property
+    def page_count(self) -> int:
+        return len(self._writer.page_refs)
+
+    def finish(self):
+        """Wait for outstanding pages and return the PDF file at offset 0 (the caller closes it)."""
+        try:
+            while self._pending:
+                self._drain(block=True)
+            if not self._writer.page_refs:
+                raise ValueError("No valid image files were provided.")
+            self._writer.close()
+        except Exception:
+            self.close()
+            raise
+        self._pool.shutdown(wait=True)
+        self._out.seek(0)
+        return self._out
+
+    def close(self) -> None:
+        """Abandon the conversion: cancel queued work and discard the output."""
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._pool.shutdown(wait=True)
+        self._out.close()
+
+
+def images_to_pdf_file(file_objs: list, page_size: Optional[str] = None, dpi: Optional[int] = None):
+    """
+    Convert a list of uploaded image file-like objects to a single multi-page
+    PDF, written page by page into a spooled temp file (returned at offset 0).
+
+    page_size ("A4" / "LETTER") fits each image onto a page of that size;
+    dpi caps the resolution of the placed image, downsampling larger ones.
+    Without page_size the page is the image at 72 dpi, as before.
+    """
+    pipeline = ImagesToPdfPipeline(page_size=page_size, dpi=dpi)
+    try:
+        for f in file_objs:
+            pipeline.submit(f)
+    except Exception:
+        pipeline.close()
+        raise
+    return pipeline.finish()
+
+
+def images_to_pdf_bytes(file_objs: list, page_size: Optional[str] = None, dpi: Optional[int] = None) -> bytes:
+    """
+    Convert a list of uploaded image file-like objects to a single multi-page PDF.
+    Returns PDF bytes.
+    """
+    with images_to_pdf_file(file_objs, page_size=page_size, dpi=dpi) as f:
+        return f.read()
+
+
+# -------------------------
+# Local disk cache
+# -------------------------
+
+class _DiskCache:
+    """
+    Size-bounded cache of byte blobs stored as one file per key.
+    Hits refresh the file mtime, so eviction removes the least recently used
+    entries first. Safe to share between worker processes: writes are atomic
+    renames and the size budget is re-measured from disk before evicting.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_size: Optional[int] = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
 
-            if isinstance(f, (bytes, bytearray)):
-                img = Image.open(BytesIO(f))
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return data
+
+    def set(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.warning("Could not write cache entry %s", path, exc_info=True)
+            return
+
+        with self._lock:
+            if self._approx_size is None:
+                self._approx_size = self._measure()[0]
             else:
-                content = f.read()
-                if not content:
+                self._approx_size += len(data)
+            if self._approx_size > self.max_bytes:
+                self._evict()
+
+    def _measure(self) -> Tuple[int, List[Tuple[float, int, str]]]:
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
                     continue
-                img = Image.open(BytesIO(content))
-        except UnidentifiedImageError:
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        return total, entries
+
+    def _evict(self) -> None:
+        # Trim to 90% of the budget so we don't rescan on every write.
+        total, entries = self._measure()
+        target = int(self.max_bytes * 0.9)
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._approx_size = total
+
+
+_ocr_cache = _DiskCache(_OCR_CACHE_DIR, _OCR_CACHE_MAX_BYTES) if _OCR_CACHE_MAX_BYTES > 0 else None
+_artifact_cache = (
+    _DiskCache(_ARTIFACT_CACHE_DIR, _ARTIFACT_CACHE_MAX_BYTES) if _ARTIFACT_CACHE_MAX_BYTES > 0 else None
+)
+
+
+def _document_key(pdf_bytes: bytes) -> str:
+    return hashlib.blake2b(pdf_bytes, digest_size=20).hexdigest()
+
+
+def _load_artifact(doc_key: str, kind: str):
+    """
+    Cached artifact of one document, or None. Entries are zlib-compressed
+    JSON, so a tampered cache directory can't run code; tuples come back
+    as lists.
+    """
+    if _artifact_cache is None:
+        return None
+    blob = _artifact_cache.get(f"{doc_key}-v{_ARTIFACT_VERSION}-{kind}")
+    if blob is None:
+        return None
+    try:
+        return json.loads(zlib.decompress(blob))
+    except Exception:
+        logger.warning("Discarding unreadable %s artifact for %s", kind, doc_key, exc_info=True)
+        return None
+
+
+def _store_artifact(doc_key: str, kind: str, value) -> None:
+    if _artifact_cache is None:
+        return
+    # default=str: pattern colour names and the like only need to read back as "not a colour"
+    blob = zlib.compress(json.dumps(value, separators=(",", ":"), default=str).encode("utf-8"), 6)
+    _artifact_cache.set(f"{doc_key}-v{_ARTIFACT_VERSION}-{kind}", blob)
+
+
+def _load_page_artifacts(doc_key: str, kind: str) -> Dict[int, object]:
+    """Per-page artifacts keyed by page index or number ({} if none are cached)."""
+    pages = _load_artifact(doc_key, kind)
+    if not isinstance(pages, dict):
+        return {}
+    try:
+        return {int(k): v for k, v in pages.items()}
+    except ValueError:
+        return {}
+
+
+def _store_page_artifacts(doc_key: str, kind: str, cached: Dict[int, object], new: Dict[int, object]) -> None:
+    """Merge freshly computed per-page artifacts into what was loaded and write them back."""
+    if new:
+        _store_artifact(doc_key, kind, {**cached, **new})
+
+
+# -------------------------
+# Rasterization
+# -------------------------
+
+def _mediabox_size(page) -> Tuple[float, float]:
+    x0, y0, x1, y1 = page.mediabox
+    return abs(x1 - x0), abs(y1 - y0)
+
+
+def _pdf_page_sizes(pdf_bytes: bytes, doc_key: Optional[str] = None) -> List[Tuple[float, float]]:
+    """Page (width, height) in points, read from the page tree without interpreting content."""
+    doc_key = doc_key or _document_key(pdf_bytes)
+    sizes = _load_artifact(doc_key, "page-sizes")
+    if sizes is not None:
+        return [tuple(size) for size in sizes]
+    try:
+        sizes = [_mediabox_size(p) for p in _open_pdfminer_pages(pdf_bytes)]
+    except Exception:
+        info = pdfinfo_from_bytes(pdf_bytes)
+        m = re.search(r"([\d.]+)\s*x\s*([\d.]+)", str(info.get("Page size", "")))
+        size = (float(m.group(1)), float(m.group(2))) if m else _DEFAULT_PAGE_SIZE
+        sizes = [size] * int(info["Pages"])
+    _store_artifact(doc_key, "page-sizes", sizes)
+    return sizes
+
+
+def plan_raster_dpi(
+    page_sizes: List[Tuple[float, float]],
+    page_indices: List[int],
+    dpi: int,
+    max_request_pixels: Optional[int] = _RASTER_MAX_REQUEST_PIXELS,
+) -> Dict[int, int]:
+    """
+    Choose the DPI each page is actually rendered at. A page whose pixel
+    count at the requested DPI exceeds _RASTER_MAX_PAGE_PIXELS is rendered
+    lower; if the selected pages together exceed max_request_pixels, all of
+    them are scaled down (not below _RASTER_MIN_DPI). Raises
+    RasterBudgetExceeded when the request can't fit the budget even at the
+    minimum DPI.
+    """
+    areas = {}
+    plan: Dict[int, int] = {}
+    for idx in page_indices:
+        w, h = page_sizes[idx] if idx < len(page_sizes) else _DEFAULT_PAGE_SIZE
+        area = max((w / 72.0) * (h / 72.0), 1e-6)  # square inches
+        areas[idx] = area
+        cap = int(math.sqrt(_RASTER_MAX_PAGE_PIXELS / area))
+        plan[idx] = max(1, min(dpi, cap))
+
+    if max_request_pixels:
+        total = sum(areas[i] * plan[i] ** 2 for i in plan)
+        if total > max_request_pixels:
+            factor = math.sqrt(max_request_pixels / total)
+            for idx in plan:
+                plan[idx] = min(plan[idx], max(_RASTER_MIN_DPI, int(plan[idx] * factor)))
+            total = sum(areas[i] * plan[i] ** 2 for i in plan)
+            if total > max_request_pixels:
+                raise RasterBudgetExceeded(
+                    f"Document too large to rasterize: {len(plan)} page(s) need "
+                    f"{int(total / 1e6)} MP even at {_RASTER_MIN_DPI} dpi "
+                    f"(limit {max_request_pixels // 1_000_000} MP). Select fewer pages."
+                )
+    return plan
+
+
+class RasterBackend(abc.ABC):
+    """
+    Renders PDF pages. pdf_source is the raw PDF bytes or a path on disk;
+    page numbers are 1-based and inclusive, None meaning the whole document.
+    """
+
+    name = ""
+
+    @abc.abstractmethod
+    def render(
+        self,
+        pdf_source,
+        dpi: int,
+        first_page: Optional[int] = None,
+        last_page: Optional[int] = None,
+        grayscale: bool = False,
+    ) -> List[Image.Image]:
+        """Rendered pages as PIL images, in page order."""
+
+    def render_arrays(
+        self,
+        pdf_source,
+        dpi: int,
+        first_page: Optional[int] = None,
+        last_page: Optional[int] = None,
+    ) -> List["np.ndarray"]:
+        """RGB uint8 arrays (H, W, 3); used for thumbnails."""
+        return [np.asarray(img.convert("RGB")) for img in self.render(pdf_source, dpi, first_page, last_page)]
+
+    def render_jpeg_files(
+        self,
+        pdf_path: str,
+        dpi: int,
+        first_page: int,
+        last_page: int,
+        output_dir: str,
+        prefix: str,
+        quality: int = 85,
+        grayscale: bool = False,
+    ) -> List[str]:
+        return list(self.iter_jpeg_files(pdf_path, dpi, first_page, last_page, output_dir, prefix, quality, grayscale))
+
+    def iter_jpeg_files(
+        self,
+        pdf_path: str,
+        dpi: int,
+        first_page: int,
+        last_page: int,
+        output_dir: str,
+        prefix: str,
+        quality: int = 85,
+        grayscale: bool = False,
+    ):
+        """Write one JPEG per page into output_dir, yielding each path in page order once the file is complete."""
+        for offset, img in enumerate(self.render(pdf_path, dpi, first_page, last_page, grayscale=grayscale)):
+            path = os.path.join(output_dir, f"{prefix}-{first_page + offset:05d}.jpg")
+            img.save(path, format="JPEG", quality=quality)
+            yield path
+
+
+class PopplerBackend(RasterBackend):
+    """pdf2image / pdftoppm: one subprocess per call, image files in between."""
+
+    name = "poppler"
+
+    def render(self, pdf_source, dpi, first_page=None, last_page=None, grayscale=False):
+        # Keep pdftoppm's input copy and PPM files in managed scratch space, not the system temp dir.
+        with scratch.job("ppm") as job:
+            if isinstance(pdf_source, (bytes, bytearray)):
+                pdf_source = job.write_bytes("input.pdf", pdf_source)
+            images = convert_from_path(
+                pdf_source,
+                dpi=dpi,
+                first_page=first_page,
+                last_page=last_page,
+                grayscale=grayscale,
+                output_folder=job.path,
+            )
+            job.track()
+            job.check()
+            # Decode before the directory is removed; images from an output folder load lazily.
+            for img in images:
+                img.load()
+        return images
+
+    def render_jpeg_files(self, pdf_path, dpi, first_page, last_page, output_dir, prefix, quality=85, grayscale=False):
+        # pdftoppm encodes the JPEGs itself; Python never sees the pixels.
+        paths = convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            first_page=first_page,
+            last_page=last_page,
+            fmt="jpeg",
+            jpegopt={"quality": quality},
+            grayscale=grayscale,
+            output_folder=output_dir,
+            output_file=prefix,
+            paths_only=True,
+        )
+        return sorted(paths)
+
+    def iter_jpeg_files(self, pdf_path, dpi, first_page, last_page, output_dir, prefix, quality=85, grayscale=False):
+        # One pdftoppm call for the whole run, watched from here: it writes
+        # pages one after another, so a file is complete once a later one exists.
+        def run_files():
+            return sorted(
+                os.path.join(output_dir, name) for name in os.listdir(output_dir)
+                if name.startswith(f"{prefix}-") and name.endswith(".jpg")
+            )
+
+        emitted = set()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(
+                self.render_jpeg_files, pdf_path, dpi, first_page, last_page, output_dir, prefix, quality, grayscale
+            )
+            while not future.done():
+                wait_futures([future], timeout=_JPEG_POLL_SECONDS)
+                complete = run_files() if future.done() else run_files()[:-1]
+                for path in complete:
+                    if path not in emitted:
+                        emitted.add(path)
+                        yield path
+            future.result()
+            # Pages the caller already consumed may be gone; the rest are yielded now.
+            for path in run_files():
+                if path not in emitted:
+                    emitted.add(path)
+                    yield path
+
+
+class PdfiumBackend(RasterBackend):
+    """In-process rendering with PDFium (pypdfium2) into NumPy buffers: no subprocess, no temp files."""
+
+    name = "pdfium"
+
+    def _iter_arrays(self, pdf_source, dpi, first_page, last_page, grayscale):
+        # The lock is taken per call, not across yields, so a slow consumer
+        # doesn't hold up other threads' renders.
+        with _PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(pdf_source)
+            page_count = len(pdf)
+        try:
+            first = (first_page or 1) - 1
+            last = min(last_page or page_count, page_count) - 1
+            for i in range(first, last + 1):
+                with _PDFIUM_LOCK:
+                    page = pdf[i]
+                    try:
+                        bitmap = page.render(scale=dpi / 72.0, grayscale=grayscale, rev_byteorder=True)
+                        # Copy out of the PDFium-owned buffer before the bitmap is released.
+                        arr = np.array(bitmap.to_numpy())
+                        bitmap.close()
+                    finally:
+                        page.close()
+                if arr.ndim == 3 and arr.shape[2] == 1:
+                    arr = arr[:, :, 0]
+                yield arr
+        finally:
+            with _PDFIUM_LOCK:
+                pdf.close()
+
+    def render(self, pdf_source, dpi, first_page=None, last_page=None, grayscale=False):
+        return [Image.fromarray(a) for a in self._iter_arrays(pdf_source, dpi, first_page, last_page, grayscale)]
+
+    def render_arrays(self, pdf_source, dpi, first_page=None, last_page=None):
+        return list(self._iter_arrays(pdf_source, dpi, first_page, last_page, False))
+
+    def iter_jpeg_files(self, pdf_path, dpi, first_page, last_page, output_dir, prefix, quality=85, grayscale=False):
+        # Encode each page as soon as it is rendered instead of holding the whole run.
+        for offset, arr in enumerate(self._iter_arrays(pdf_path, dpi, first_page, last_page, grayscale)):
+            path = os.path.join(output_dir, f"{prefix}-{first_page + offset:05d}.jpg")
+            Image.fromarray(arr).save(path, format="JPEG", quality=quality)
+            yield path
+
+
+RASTER_BACKENDS = {PopplerBackend.name: PopplerBackend}
+if HAS_PDFIUM:
+    RASTER_BACKENDS[PdfiumBackend.name] = PdfiumBackend
+
+
+def get_raster_backend(name: Optional[str] = None) -> RasterBackend:
+    """Backend by name; None picks the deployment default (PDF_RASTER_BACKEND)."""
+    name = (name or _DEFAULT_RASTER_BACKEND).lower()
+    if name == PdfiumBackend.name and not HAS_PDFIUM:
+        raise RuntimeError("The pdfium raster backend needs the pypdfium2 package.")
+    if name not in RASTER_BACKENDS:
+        raise ValueError(f"Unknown raster backend '{name}'.")
+    return RASTER_BACKENDS[name]()
+
+
+def _page_runs(page_indices: List[int], *page_maps: Optional[Dict[int, object]]) -> List[Tuple[int, int]]:
+    """
+    Group 0-based page indices into inclusive (first, last) runs of
+    consecutive pages that share the same value in every page map
+    (planned DPI, colour mode, ...), so each run is one poppler call.
+    """
+    runs: List[Tuple[int, int]] = []
+    for idx in sorted(set(page_indices)):
+        same = all(m is None or m.get(idx) == m.get(idx - 1) for m in page_maps)
+        if runs and idx == runs[-1][1] + 1 and same:
+            runs[-1] = (runs[-1][0], idx)
+        else:
+            runs.append((idx, idx))
+    return runs
+
+
+def _render_thumbnails(
+    pdf_source,
+    page_indices: List[int],
+    backend: Optional[RasterBackend] = None,
+    dpi: int = _THUMBNAIL_DPI,
+) -> Dict[int, "np.ndarray"]:
+    """Low-resolution RGB renders of the given pages as uint8 arrays (H, W, 3)."""
+    backend = backend or get_raster_backend()
+    thumbs: Dict[int, np.ndarray] = {}
+    for first, last in _page_runs(page_indices):
+        arrays = backend.render_arrays(pdf_source, dpi, first + 1, last + 1)
+        for offset, arr in enumerate(arrays):
+            thumbs[first + offset] = arr
+    return thumbs
+
+
+def _image_xobject_modes(page) -> set:
+    """PIL-style modes ("1", "L", "RGB") of the image XObjects in a page's resources."""
+    modes = set()
+    resources = resolve1(page.resources) or {}
+    xobjects = resolve1(resources.get("XObject")) or {}
+    for ref in xobjects.values():
+        xobj = resolve1(ref)
+        if not isinstance(xobj, PDFStream) or xobj.get("Subtype") is not LITERAL_IMAGE:
             continue
-        except Exception:
+        filters = resolve1(xobj.get("Filter"))
+        filters = filters if isinstance(filters, list) else [filters]
+        if (
+            resolve1(xobj.get("ImageMask"))
+            or resolve1(xobj.get("BitsPerComponent")) == 1
+            or any(f in (LITERAL_CCITTFAX, LITERAL_JBIG2) for f in filters)
+        ):
+            modes.add("1")
             continue
+        cs = resolve1(xobj.get("ColorSpace"))
+        if isinstance(cs, list) and cs and cs[0] is LITERAL_ICC_BASED:
+            n = resolve1(resolve1(cs[1]).get("N")) if len(cs) > 1 else None
+            modes.add("L" if n == 1 else "RGB")
+        elif cs in (LITERAL_DEVICE_GRAY, LITERAL_CAL_GRAY):
+            modes.add("L")
+        else:
+            modes.add("RGB")
+    return modes
+
+
+def _classify_colorspace(thumb: "np.ndarray", xobject_modes: set) -> str:
+    """
+    "RGB" if the thumbnail shows any colour, "1" for grey pages whose
+    images are all bilevel (fax/JBIG2 scans), otherwise "L". A single
+    coloured thumbnail pixel keeps the page in RGB: small logos and link
+    lines cover only a few pixels at thumbnail resolution.
+    """
+    spread = thumb.max(axis=2).astype(np.int16) - thumb.min(axis=2)
+    if spread.max() > _GRAY_TOLERANCE:
+        return "RGB"
+    if xobject_modes and xobject_modes <= {"1"}:
+        return "1"
+    return "L"
+
+
+def detect_page_colorspaces(
+    pdf_source,
+    page_indices: List[int],
+    pdf_pages: Optional[list] = None,
+    thumbs: Optional[Dict[int, "np.ndarray"]] = None,
+    backend: Optional[RasterBackend] = None,
+) -> Dict[int, str]:
+    """
+    Decide per page whether it can be rendered as "L" or "1" instead of
+    RGB, from a low-resolution render plus the page's image XObjects.
+    Falls back to RGB for every page if detection is disabled or fails.
+    """
+    if not _DETECT_COLORSPACE or not page_indices:
+        return {idx: "RGB" for idx in page_indices}
+    try:
+        if pdf_pages is None:
+            pdf_bytes = pdf_source
+            if not isinstance(pdf_bytes, (bytes, bytearray)):
+                with open(pdf_source, "rb") as f:
+                    pdf_bytes = f.read()
+            pdf_pages = _open_pdfminer_pages(pdf_bytes)
+        if thumbs is None:
+            thumbs = _render_thumbnails(pdf_source, page_indices, backend)
+        return {
+            idx: _classify_colorspace(thumbs[idx], _image_xobject_modes(pdf_pages[idx])) if idx in thumbs else "RGB"
+            for idx in page_indices
+        }
+    except Exception:
+        logger.warning("Colourspace detection failed; rendering pages as RGB.", exc_info=True)
+        return {idx: "RGB" for idx in page_indices}
+
+
+def _is_blank_thumbnail(thumb: "np.ndarray") -> bool:
+    """
+    A page is blank when almost no pixels are clearly darker than the
+    page background (ink coverage) and the overall variance is low, which
+    tolerates scanner noise and off-white paper.
+    """
+    gray = thumb.mean(axis=2) if thumb.ndim == 3 else thumb.astype(np.float32)
+    background = np.median(gray)
+    ink = np.count_nonzero(gray < background - _BLANK_INK_DELTA) / gray.size
+    return ink <= _BLANK_MAX_INK and float(gray.std()) <= _BLANK_MAX_STDDEV
 
+
+def _has_visible_marks(render: "np.ndarray") -> bool:
+    """
+    True if a page render at _BLANK_CONFIRM_DPI has any real marks: ink
+    pixels that touch another ink pixel. Isolated specks (scanner noise,
+    dust) don't count, but a page number or a one-line footer does.
+    """
+    gray = render.mean(axis=2) if render.ndim == 3 else render.astype(np.float32)
+    ink = gray < np.median(gray) - _BLANK_INK_DELTA
+    touching = np.zeros_like(ink)
+    touching[1:, :] |= ink[:-1, :]
+    touching[:-1, :] |= ink[1:, :]
+    touching[:, 1:] |= ink[:, :-1]
+    touching[:, :-1] |= ink[:, 1:]
+    return np.count_nonzero(ink & touching) >= _BLANK_MIN_MARK_PIXELS
+
+
+def detect_blank_pages(
+    pdf_source,
+    page_indices: List[int],
+    thumbs: Optional[Dict[int, "np.ndarray"]] = None,
+    backend: Optional[RasterBackend] = None,
+) -> set:
+    """
+    Indices of the given pages that are blank. Thumbnails pick the
+    candidates; each candidate is then re-rendered at _BLANK_CONFIRM_DPI,
+    since sparse small text (a lone page number) vanishes at thumbnail size.
+    """
+    if not page_indices:
+        return set()
+    try:
+        if thumbs is None:
+            thumbs = _render_thumbnails(pdf_source, page_indices, backend)
+        candidates = [idx for idx in page_indices if idx in thumbs and _is_blank_thumbnail(thumbs[idx])]
+        blanks = set()
+        for first, last in _page_runs(candidates):
+            confirm = _render_thumbnails(pdf_source, list(range(first, last + 1)), backend, dpi=_BLANK_CONFIRM_DPI)
+            blanks.update(idx for idx, render in confirm.items() if not _has_visible_marks(render))
+        return blanks
+    except Exception:
+        logger.warning("Blank-page detection failed; treating every page as non-blank.", exc_info=True)
+        return set()
+
+
+def _analyze_pages(
+    pdf_source,
+    page_indices: List[int],
+    blank_pages: str,
+    backend: Optional[RasterBackend] = None,
+) -> Tuple[Dict[int, str], set]:
+    """
+    Colour mode per page and the set of blank pages, sharing one thumbnail
+    render. Blank detection only runs when blank_pages isn't "keep".
+    """
+    want_blank = blank_pages != BLANK_KEEP
+    thumbs = None
+    if page_indices and (_DETECT_COLORSPACE or want_blank):
         try:
-            pil_images.append(img.convert("RGB"))
+            thumbs = _render_thumbnails(pdf_source, page_indices, backend)
         except Exception:
-            try:
-                pil_images.append(Image.fromarray(img).convert("RGB"))
-            except Exception:
-                continue
+            logger.warning("Thumbnail render failed; skipping page analysis.", exc_info=True)
+            thumbs = {}
+    page_modes = detect_page_colorspaces(pdf_source, page_indices, thumbs=thumbs)
+    blanks = detect_blank_pages(pdf_source, page_indices, thumbs=thumbs) if want_blank else set()
+    return page_modes, blanks
 
-    if not pil_images:
-        raise ValueError("No valid image files were provided.")
 
-    out = BytesIO()
-    first, rest = pil_images[0], pil_images[1:]
-    first.save(out, format="PDF", save_all=bool(rest), append_images=rest)
-    out.seek(0)
-    return out.read()
+@functools.lru_cache(maxsize=8)
+def _blank_jpeg_bytes(width: int, height: int) -> bytes:
+    buf = BytesIO()
+    Image.new("L", (max(width, 1), max(height, 1)), 255).save(buf, format="JPEG", quality=50)
+    return buf.getvalue()
+
+
+def _blank_page_jpeg(page_size: Tuple[float, float], dpi: int) -> bytes:
+    w, h = page_size
+    return _blank_jpeg_bytes(int(round(w / 72.0 * dpi)), int(round(h / 72.0 * dpi)))
+
+
+def _to_mode(img: Image.Image, mode: str) -> Image.Image:
+    if mode == "1" and img.mode != "1":
+        return img.convert("L").convert("1", dither=Image.Dither.NONE)
+    if mode == "L" and img.mode != "L":
+        return img.convert("L")
+    return img
+
+
+def _render_pages(
+    pdf_bytes: bytes,
+    page_indices: Optional[List[int]],
+    dpi: int = 200,
+    page_dpis: Optional[Dict[int, int]] = None,
+    page_modes: Optional[Dict[int, str]] = None,
+    backend: Optional[RasterBackend] = None,
+):
+    """
+    Rasterize only the requested (0-based) pages, one backend call per
+    contiguous run; None renders the whole document. page_dpis (from
+    plan_raster_dpi) overrides dpi per page, and page_modes (from
+    detect_page_colorspaces) renders grey / bilevel pages as "L" / "1".
+    Yields (page_index, PIL image) in page order.
+    """
+    backend = backend or get_raster_backend()
+    if page_indices is None:
+        for idx, img in enumerate(backend.render(pdf_bytes, dpi)):
+            yield idx, img
+        return
+
+    for first, last in _page_runs(page_indices, page_dpis, page_modes):
+        run_dpi = page_dpis.get(first, dpi) if page_dpis else dpi
+        run_mode = page_modes.get(first, "RGB") if page_modes else "RGB"
+        images = backend.render(pdf_bytes, run_dpi, first + 1, last + 1, grayscale=run_mode != "RGB")
+        for offset, img in enumerate(images):
+            yield first + offset, _to_mode(img, run_mode)
+
+
+def _render_pages_to_jpeg_files(
+    pdf_path: str,
+    page_indices: List[int],
+    dpi: int,
+    output_dir: str,
+    quality: int = 85,
+    page_dpis: Optional[Dict[int, int]] = None,
+    page_modes: Optional[Dict[int, str]] = None,
+    backend: Optional[RasterBackend] = None,
+):
+    """
+    Write one JPEG per page into output_dir, one backend call per run of
+    pages sharing DPI and colour mode. With poppler, pdftoppm encodes them
+    itself (no PIL decode or re-encode in Python); grey and bilevel pages
+    become single-channel JPEGs. Yields (page_index, path) in page order,
+    each as soon as its file is complete.
+    """
+    backend = backend or get_raster_backend()
+    for first, last in _page_runs(page_indices, page_dpis, page_modes):
+        run_dpi = page_dpis.get(first, dpi) if page_dpis else dpi
+        run_mode = page_modes.get(first, "RGB") if page_modes else "RGB"
+        paths = backend.iter_jpeg_files(
+            pdf_path,
+            run_dpi,
+            first + 1,
+            last + 1,
+            output_dir,
+            prefix=f"run{first + 1}",
+            quality=quality,
+            grayscale=run_mode != "RGB",
+        )
+        for offset, path in enumerate(paths):
+            yield first + offset, path
 
 
 # -------------------------
 # PDF -> TXT (with OCR fallback)
 # -------------------------
 
-def _extract_with_pdfminer(pdf_bytes: bytes, laparams: Optional[LAParams] = None) -> str:
+def _open_pdfminer_pages(pdf_bytes: bytes) -> list:
+    """Parse the document structure once and return its PDFPage objects."""
+    parser = PDFParser(io.BytesIO(pdf_bytes))
+    doc = PDFDocument(parser)
+    return list(PDFPage.create_pages(doc))
+
+
+def _count_string_glyphs(text_block: bytes) -> int:
+    count = 0
+    for m in _PDF_STRING_RE.finditer(text_block):
+        token = m.group(0)
+        if token[:1] == b"(":
+            count += len(token) - 2 - token.count(b"\\")
+        else:
+            count += sum(1 for c in token[1:-1] if c not in b" \t\r\n") // 2
+    return count
+
+
+def _census_content(data: bytes, resources, census: dict, depth: int = 0) -> None:
+    for block in _PDF_TEXT_BLOCK_RE.finditer(data):
+        census["glyphs"] += _count_string_glyphs(block.group(1))
+    census["images"] += len(_PDF_INLINE_IMAGE_RE.findall(data))
+    census["paths"] += len(_PDF_FILL_RE.findall(data))
+
+    resources = resolve1(resources) or {}
+    fonts = resolve1(resources.get("Font")) or {}
+    census["fonts"] += len(fonts)
+
+    xobjects = resolve1(resources.get("XObject")) or {}
+    for raw_name in _PDF_DO_RE.findall(data):
+        xobj = resolve1(xobjects.get(raw_name.decode("latin-1")))
+        if not isinstance(xobj, PDFStream):
+            continue
+        subtype = xobj.get("Subtype")
+        if subtype is LITERAL_IMAGE:
+            census["images"] += 1
+        elif subtype is LITERAL_FORM and depth < 4:
+            try:
+                form_data = xobj.get_data()
+            except Exception:
+                continue
+            _census_content(form_data, xobj.get("Resources") or resources, census, depth + 1)
+
+
+def _page_text_census(page) -> dict:
+    """
+    Cheap per-page inventory taken straight from the content stream, without
+    running the interpreter: approximate glyph count, image XObjects (including
+    inline images), fonts and filled paths.
+    """
+    census = {"glyphs": 0, "images": 0, "fonts": 0, "paths": 0}
+    chunks = []
+    for stream in page.contents or []:
+        stream = resolve1(stream)
+        if isinstance(stream, PDFStream):
+            try:
+                chunks.append(stream.get_data())
+            except Exception:
+                continue
+    _census_content(b"\n".join(chunks), page.resources, census)
+    return census
+
+
+def _route_page(census: dict, ocr: bool, mode: str = TXT_MODE_ACCURATE) -> str:
+    """
+    Extraction route of one page from its census. "accurate" keeps every
+    text page on the layout extractor; "balanced" lets plain prose pages
+    take the fast path, where content-stream order is already reading order.
+    """
+    if census["glyphs"] >= _MIN_TEXT_GLYPHS:
+        if mode == TXT_MODE_FAST:
+            return _ROUTE_FAST
+        if (
+            mode == TXT_MODE_BALANCED
+            and census["fonts"] <= _FAST_MAX_FONTS
+            and not census["images"]
+            and not census["paths"]
+            and census["glyphs"] <= _FAST_MAX_GLYPHS
+        ):
+            return _ROUTE_FAST
+        return _ROUTE_TEXT
+    # Little or no real text: scans and outlined (vectorised) text need OCR.
+    if ocr and (census["images"] > 0 or census["paths"] >= _MIN_OCR_PATHS):
+        return _ROUTE_OCR
+    return _ROUTE_TEXT
+
+
+class _RawTextDevice(PDFTextDevice):
+    """
+    Collects text in content-stream order without building layout objects.
+    Glyph positions come from the text device itself; a newline is emitted
+    when the baseline moves and a space when there is a visible gap.
+    """
+
+    def __init__(self, rsrcmgr):
+        super().__init__(rsrcmgr)
+        self.parts: List[str] = []
+        self._last_y: Optional[float] = None
+        self._last_x_end: Optional[float] = None
+
+    def begin_page(self, page, ctm):
+        self.parts = []
+        self._last_y = None
+        self._last_x_end = None
+
+    def render_char(self, matrix, font, fontsize, scaling, rise, cid, *args):
+        adv = font.char_width(cid) * fontsize * scaling
+        x, y = matrix[4], matrix[5]
+        em = max(abs(fontsize * matrix[3]), abs(fontsize * matrix[0]), 1.0)
+        if self._last_y is not None:
+            if abs(y - self._last_y) > em * 0.5:
+                self.parts.append("\n")
+            elif self._last_x_end is not None and x - self._last_x_end > em * 0.25:
+                self.parts.append(" ")
+        try:
+            self.parts.append(font.to_unichr(cid))
+        except Exception:
+            self.parts.append(f"(cid:{cid})")
+        self._last_y = y
+        self._last_x_end = x + adv * matrix[0]
+        return adv
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+def _iter_pages_raw(pages: list, page_indices: List[int]):
+    """Content-stream-order extraction with no layout analysis. Yields (page_index, text)."""
+    rsrcmgr = PDFResourceManager(caching=True)
+    device = _RawTextDevice(rsrcmgr)
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    for idx in page_indices:
+        try:
+            interpreter.process_page(pages[idx])
+            yield idx, device.text()
+        except Exception:
+            yield idx, ""
+
+
+def _iter_pages_pdfminer(pages: list, page_indices: List[int], laparams: Optional[LAParams] = None):
+    """
+    Run pdfminer layout extraction on the selected pages only, sharing one
+    interpreter. Yields (page_index, text) in the order given.
+    """
     if laparams is None:
-        laparams = LAParams(char_margin=2.0, line_margin=0.5, word_margin=0.1, boxes_flow=0.5)
-    try:
-        return pdfminer_extract_text(io.BytesIO(pdf_bytes), laparams=laparams) or ""
-    except Exception:
-        return ""
+        laparams = _ACCURATE_LAPARAMS
 
+    rsrcmgr = PDFResourceManager(caching=True)
+    out = io.StringIO()
+    device = TextConverter(rsrcmgr, out, laparams=laparams)
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
 
-def _extract_with_pdfplumber_per_page(pdf_bytes: bytes) -> List[str]:
-    pages: List[str] = []
     try:
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            for page in pdf.pages:
-                try:
-                    txt = page.extract_text(x_tolerance=2, y_tolerance=2) or ""
-                except Exception:
-                    txt = ""
-                pages.append(txt)
-    except Exception:
-        return []
-    return pages
+        for idx in page_indices:
+            out.seek(0)
+            out.truncate()
+            try:
+                interpreter.process_page(pages[idx])
+                yield idx, out.getvalue().rstrip("\f")
+            except Exception:
+                yield idx, ""
+    finally:
+        device.close()
+
+
+def _iter_pages_pdfplumber(pdf_bytes: bytes, page_numbers: Optional[List[int]] = None):
+    """Yield plain text per page (1-based page_numbers, all pages if None)."""
+    pages = _iter_pdfplumber_pages(pdf_bytes, page_numbers)
+    while True:
+        try:
+            page = next(pages)
+        except StopIteration:
+            return
+        except Exception:
+            logger.warning("pdfplumber could not open the PDF.", exc_info=True)
+            return
+        try:
+            txt = page.extract_text(x_tolerance=2, y_tolerance=2) or ""
+        except Exception:
+            txt = ""
+        yield txt
+
+
+def _extract_with_pdfplumber_per_page(pdf_bytes: bytes, page_numbers: Optional[List[int]] = None) -> List[str]:
+    return list(_iter_pages_pdfplumber(pdf_bytes, page_numbers))
+
+
+def _ocr_cache_key(pil_image: Image.Image, lang: str, config: str) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{pil_image.mode}|{pil_image.size[0]}x{pil_image.size[1]}|{lang}|{config}|".encode("utf-8"))
+    h.update(pil_image.tobytes())
+    return h.hexdigest()
 
 
 def _ocr_page_image(pil_image: Image.Image, lang: str = "eng") -> str:
     config = "--psm 3 --oem 1"
+
+    key = None
+    if _ocr_cache is not None:
+        try:
+            key = _ocr_cache_key(pil_image, lang, config)
+            cached = _ocr_cache.get(key)
+            if cached is not None:
+                return cached.decode("utf-8")
+        except Exception:
+            key = None
+
     try:
-        return pytesseract.image_to_string(pil_image, lang=lang, config=config) or ""
+        text = pytesseract.image_to_string(pil_image, lang=lang, config=config) or ""
     except Exception:
         return ""
 
+    if key is not None:
+        _ocr_cache.set(key, text.encode("utf-8"))
+    return text
 
-def pdf_to_txt_bytes(
+
+def _ocr_if_better(
+    pdf_bytes: bytes,
+    idx: int,
+    text: str,
+    lang: str,
+    page_size: Optional[Tuple[float, float]] = None,
+    backend: Optional[RasterBackend] = None,
+) -> str:
+    if page_size is None:
+        sizes = _pdf_page_sizes(pdf_bytes)
+        page_size = sizes[idx] if idx < len(sizes) else _DEFAULT_PAGE_SIZE
+    page_dpis = {idx: plan_raster_dpi([page_size], [0], 300, max_request_pixels=None)[0]}
+    # Tesseract binarizes its input anyway, so colour is never needed for OCR.
+    for _idx, pil in _render_pages(pdf_bytes, [idx], dpi=300, page_dpis=page_dpis, page_modes={idx: "L"}, backend=backend):
+        ocr_text = _ocr_page_image(pil, lang=lang)
+        if len(ocr_text.strip()) > len(text.strip()):
+            return ocr_text
+    return text
+
+
+def _iter_text_layer(pdf_bytes: bytes, pdf_pages: list, page_indices: List[int], mode: str, preserve_layout: bool):
+    """Pick the text-layer extractor for the requested tier. Yields (page_index, text)."""
+    if mode == TXT_MODE_FAST:
+        return _iter_pages_raw(pdf_pages, page_indices)
+    if mode == TXT_MODE_BALANCED:
+        return _iter_pages_pdfminer(pdf_pages, page_indices, laparams=_BALANCED_LAPARAMS)
+    if preserve_layout:
+        return _iter_pages_pdfminer(pdf_pages, page_indices)
+    return zip(page_indices, _iter_pages_pdfplumber(pdf_bytes, [i + 1 for i in page_indices]))
+
+
+def _iter_page_texts(
+    pdf_bytes: bytes,
+    pdf_pages: Optional[list],
+    selected: Optional[List[int]],
+    ocr: bool,
+    lang: str,
+    preserve_layout: bool,
+    mode: str = "accurate",
+    blank_pages: str = "keep",
+    backend: Optional[RasterBackend] = None,
+):
+    """
+    Yield the text of each selected page (all pages if selected is None) in
+    order as soon as it is extracted. A content-stream census decides per
+    page between text-layer extraction (tier chosen by mode) and OCR, so
+    image-only documents skip layout analysis and text-only documents never
+    start poppler. Unless blank_pages is "keep", blank pages bound for OCR
+    are recognised on thumbnails and never OCR'd; None is yielded for them
+    when blank_pages is "skip".
+    """
+    doc_key = _document_key(pdf_bytes)
+    census = []
+    if pdf_pages is not None:
+        if selected is None:
+            selected = list(range(len(pdf_pages)))
+        cached_census = _load_page_artifacts(doc_key, "census")
+        try:
+            new_census = {i: _page_text_census(pdf_pages[i]) for i in selected if i not in cached_census}
+            census = [cached_census.get(i) or new_census[i] for i in selected]
+            _store_page_artifacts(doc_key, "census", cached_census, new_census)
+        except Exception:
+            logger.warning("Text-layer census failed; extracting pages with pdfplumber.", exc_info=True)
+            census = []
+
+    if not census:
+        page_numbers = [i + 1 for i in selected] if selected is not None else None
+        any_page = False
+        for pos, txt in enumerate(_iter_pages_pdfplumber(pdf_bytes, page_numbers)):
+            any_page = True
+            idx = selected[pos] if selected is not None else pos
+            if ocr and len(txt.strip()) < 20:
+                txt = _ocr_if_better(pdf_bytes, idx, txt, lang, backend=backend)
+            yield txt
+        if ocr and not any_page:
+            # Pages are OCR'd one at a time, so only the per-page pixel cap applies.
+            page_sizes = _pdf_page_sizes(pdf_bytes)
+            indices = selected if selected is not None else list(range(len(page_sizes)))
+            page_dpis = plan_raster_dpi(page_sizes, indices, 300, max_request_pixels=None)
+            for _idx, pil in _render_pages(pdf_bytes, indices, dpi=300, page_dpis=page_dpis, backend=backend):
+                yield _ocr_page_image(pil, lang=lang)
+        return
+
+    routes = [_route_page(c, ocr, mode) for c in census]
+    ocr_route = [idx for idx, r in zip(selected, routes) if r == _ROUTE_OCR]
+    blanks = set()
+    if ocr_route and blank_pages != BLANK_KEEP:
+        blanks = detect_blank_pages(pdf_bytes, ocr_route, backend=backend)
+
+    # Text layers already extracted for this document (same tier) are reused.
+    # They are cached per chunk of pages and written back as each chunk is
+    # done, so a long stream never holds more than one chunk of text.
+    text_kind = f"text-{mode}-{int(preserve_layout)}"
+    pages = zip(selected, routes, census)
+    for chunk, group in itertools.groupby(pages, key=lambda p: p[0] // _PAGE_CACHE_CHUNK_PAGES):
+        group = list(group)
+        chunk_kind = f"{text_kind}-c{chunk}"
+        cached_text = _load_page_artifacts(doc_key, chunk_kind)
+        new_text: Dict[int, str] = {}
+
+        # The extractors yield pages in increasing order, so they can be
+        # advanced lazily while walking the chunk front to back.
+        fast_iter = _iter_pages_raw(
+            pdf_pages,
+            [idx for idx, r, _c in group if r == _ROUTE_FAST and idx not in cached_text],
+        )
+        text_iter = _iter_text_layer(
+            pdf_bytes,
+            pdf_pages,
+            [idx for idx, r, _c in group if r == _ROUTE_TEXT and idx not in cached_text],
+            mode,
+            preserve_layout,
+        )
+
+        for idx, route, page_census in group:
+            if idx in blanks:
+                yield None if blank_pages == BLANK_SKIP else ""
+                continue
+
+            txt = ""
+            if route in (_ROUTE_FAST, _ROUTE_TEXT):
+                if idx in cached_text:
+                    txt = cached_text[idx]
+                else:
+                    extractor = fast_iter if route == _ROUTE_FAST else text_iter
+                    txt = new_text[idx] = next(extractor, (idx, ""))[1]
+
+            # Text pages that came back (nearly) empty but carry images get OCR too.
+            if ocr and (route == _ROUTE_OCR or (page_census["images"] and len(txt.strip()) < 20)):
+                txt = _ocr_if_better(pdf_bytes, idx, txt, lang, page_size=_mediabox_size(pdf_pages[idx]), backend=backend)
+            yield txt
+
+        _store_page_artifacts(doc_key, chunk_kind, cached_text, new_text)
+
+
+def iter_pdf_to_txt_bytes(
     file_obj,
     ocr: bool = True,
     lang: str = "eng",
     join_pages: Optional[str] = None,
     preserve_layout: bool = True,
-) -> bytes:
+    pages: Optional[str] = None,
+    mode: str = "accurate",
+    blank_pages: str = "keep",
+    raster_backend: Optional[str] = None,
+):
+    """
+    Streaming variant of pdf_to_txt_bytes: returns an iterator of UTF-8
+    chunks, one per page (prefixed with join_pages after the first), so the
+    response can start after the first page instead of the last.
+
+    mode trades layout fidelity for throughput:
+      - "fast": content-stream order, no layout analysis
+      - "balanced": pdfminer line grouping without box ordering
+      - "accurate": full pdfminer layout analysis (or pdfplumber when
+        preserve_layout is False)
+    """
+    if mode not in TXT_MODES:
+        raise ValueError(f"Unknown text extraction mode '{mode}'.")
+    backend = get_raster_backend(raster_backend)
+
     try:
         file_obj.seek(0)
     except Exception:
@@ -531,48 +2036,411 @@ def pdf_to_txt_bytes(
     if join_pages is None:
         join_pages = "\n\n----- PAGE BREAK -----\n\n"
 
-    if preserve_layout:
-        layout_text = _extract_with_pdfminer(pdf_bytes)
-        if layout_text and len(layout_text.strip()) > 50 and "\n" in layout_text:
-            full_text = layout_text
-            if ocr:
-                pages_plumber = _extract_with_pdfplumber_per_page(pdf_bytes)
-                if pages_plumber:
-                    empty_page_indices = [i for i, t in enumerate(pages_plumber) if len(t.strip()) < 20]
-                    if empty_page_indices:
-                        pil_pages = convert_from_bytes(pdf_bytes, dpi=300)
-                        for idx in empty_page_indices:
-                            if idx < len(pil_pages):
-                                ocr_text = _ocr_page_image(pil_pages[idx], lang=lang)
-                                if ocr_text.strip():
-                                    full_text += f"\n\n----- OCR RECOVERY FOR PAGE {idx+1} -----\n\n{ocr_text}"
-            return full_text.encode("utf-8")
-
-    pages_text = _extract_with_pdfplumber_per_page(pdf_bytes)
-    if (not pages_text or all(len(t.strip()) == 0 for t in pages_text)) and ocr:
-        pil_pages = convert_from_bytes(pdf_bytes, dpi=300)
-        pages_text = [_ocr_page_image(pil, lang=lang) for pil in pil_pages]
-
-    if ocr and pages_text:
-        need_ocr = [i for i, t in enumerate(pages_text) if len(t.strip()) < 20]
-        if need_ocr:
-            pil_pages = convert_from_bytes(pdf_bytes, dpi=300)
-            for idx in need_ocr:
-                if idx < len(pil_pages):
-                    ocr_text = _ocr_page_image(pil_pages[idx], lang=lang)
-                    if len(ocr_text.strip()) > len(pages_text[idx].strip()):
-                        pages_text[idx] = ocr_text
-
-    final_text = join_pages.join(pages_text)
-    final_text = final_text.replace("\r\n", "\n").replace("\r", "\n")
-    return final_text.encode("utf-8")
+    try:
+        pdf_pages = _open_pdfminer_pages(pdf_bytes)
+        page_count = len(pdf_pages)
+    except Exception:
+        pdf_pages = None
+        page_count = _pdf_page_count(pdf_bytes) if pages else 0
+    selected = _resolve_pages(pages, page_count)
+
+    def _chunks():
+        first = True
+        for txt in _iter_page_texts(
+            pdf_bytes, pdf_pages, selected, ocr, lang, preserve_layout, mode, blank_pages, backend
+        ):
+            if txt is None:
+                continue
+            txt = txt.replace("\r\n", "\n").replace("\r", "\n")
+            yield (txt if first else join_pages + txt).encode("utf-8")
+            first = False
+
+    return _chunks()
+
+
+def pdf_to_txt_bytes(
+    file_obj,
+    ocr: bool = True,
+    lang: str = "eng",
+    join_pages: Optional[str] = None,
+    preserve_layout: bool = True,
+    pages: Optional[str] = None,
+    mode: str = "accurate",
+    blank_pages: str = "keep",
+    raster_backend: Optional[str] = None,
+) -> bytes:
+    return b"".join(
+        iter_pdf_to_txt_bytes(
+            file_obj,
+            ocr=ocr,
+            lang=lang,
+            join_pages=join_pages,
+            preserve_layout=preserve_layout,
+            pages=pages,
+            mode=mode,
+            blank_pages=blank_pages,
+            raster_backend=raster_backend,
+        )
+    )
 
 
 # -------------------------
 # PDF -> PPTX
 # -------------------------
 
-def pdf_to_pptx_bytes(file_obj, dpi: int = 150) -> bytes:
+def _blank_slide_layout(prs):
+    """First layout without placeholders, else the conventional "Blank" slot."""
+    for layout in prs.slide_layouts:
+        if len(layout.placeholders) == 0:
+            return layout
+    return prs.slide_layouts[6] if len(prs.slide_layouts) > 6 else prs.slide_layouts[0]
+
+
+def _is_photographic(img: Image.Image) -> bool:
+    """
+    Many distinct colours in a small nearest-neighbour sample means
+    continuous tone (photos, gradients), where JPEG wins; text, line art and
+    flat fills stay well under the limit and compress better as PNG.
+    """
+    if img.mode == "1":
+        return False
+    sample = img
+    if max(img.size) > _PHOTO_SAMPLE_SIZE:
+        ratio = _PHOTO_SAMPLE_SIZE / max(img.size)
+        size = (max(1, int(img.width * ratio)), max(1, int(img.height * ratio)))
+        # NEAREST so the sample has no blended edge colours.
+        sample = img.resize(size, Image.NEAREST)
+    return sample.getcolors(maxcolors=_PHOTO_MIN_COLORS) is None
+
+
+def _encode_slide_image(img: Optional[Image.Image], image_format: str = PPTX_CODEC_AUTO) -> Optional[bytes]:
+    if img is None:
+        return None
+    if image_format == PPTX_CODEC_AUTO:
+        image_format = PPTX_CODEC_JPEG if _is_photographic(img) else PPTX_CODEC_PNG
+
+    buf = BytesIO()
+    if image_format == PPTX_CODEC_JPEG:
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("L" if img.mode == "1" else "RGB")
+        img.save(buf, format="JPEG", quality=_PPTX_JPEG_QUALITY)
+    else:
+        # optimize=True retries every filter and is several times slower for a few % smaller files.
+        img.save(buf, format="PNG", compress_level=_PPTX_PNG_COMPRESS_LEVEL)
+    return buf.getvalue()
+
+
+def _pdf_color_to_rgb(color) -> Optional[RGBColor]:
+    """pdfplumber colour (grey, RGB or CMYK components in 0..1) as RGBColor; None for patterns."""
+    if color is None:
+        return None
+    if isinstance(color, (int, float)):
+        color = (color,)
+    try:
+        vals = [float(c) for c in color]
+    except (TypeError, ValueError):
+        return None
+    if len(vals) == 1:
+        rgb = (vals[0], vals[0], vals[0])
+    elif len(vals) == 3:
+        rgb = vals
+    elif len(vals) == 4:
+        c, m, y, k = vals
+        rgb = ((1 - c) * (1 - k), (1 - m) * (1 - k), (1 - y) * (1 - k))
+    else:
+        return None
+    return RGBColor(*(max(0, min(255, int(round(v * 255)))) for v in rgb))
+
+
+def _group_text_lines(words: List[dict]) -> List[dict]:
+    """
+    Merge pdfplumber words into text lines: words with (nearly) the same
+    top form a row, and a row is split where the horizontal gap is wide
+    enough to be a column break.
+    """
+    rows: List[List[dict]] = []
+    for word in sorted(words, key=lambda w: (w["top"], w["x0"])):
+        if rows and abs(word["top"] - rows[-1][0]["top"]) <= _TEXT_LINE_TOLERANCE:
+            rows[-1].append(word)
+        else:
+            rows.append([word])
+
+    lines = []
+    for row in rows:
+        row.sort(key=lambda w: w["x0"])
+        segment = [row[0]]
+        for word in row[1:]:
+            prev = segment[-1]
+            size = prev.get("size") or 10.0
+            restyled = (
+                word.get("fontname") != prev.get("fontname")
+                or word.get("non_stroking_color") != prev.get("non_stroking_color")
+            )
+            if restyled or word["x0"] - prev["x1"] > _TEXT_COLUMN_GAP * size:
+                lines.append(segment)
+                segment = [word]
+            else:
+                segment.append(word)
+        lines.append(segment)
+
+    return [
+        {
+            "text": " ".join(w["text"] for w in seg),
+            "x0": min(w["x0"] for w in seg),
+            "x1": max(w["x1"] for w in seg),
+            "top": min(w["top"] for w in seg),
+            "bottom": max(w["bottom"] for w in seg),
+            "size": max((w.get("size") or 0) for w in seg) or 10.0,
+            "fontname": seg[0].get("fontname") or "",
+            "color": seg[0].get("non_stroking_color"),
+        }
+        for seg in lines
+    ]
+
+
+def _merge_boxes(boxes: List[Tuple[float, float, float, float]], pad: float = 2.0) -> List[Tuple[float, float, float, float]]:
+    """Union overlapping (x0, top, x1, bottom) boxes; too many pieces collapse into one."""
+    if not boxes:
+        return []
+    if len(boxes) > _MAX_GRAPHIC_BOXES:
+        xs0, tops, xs1, bottoms = zip(*boxes)
+        return [(min(xs0), min(tops), max(xs1), max(bottoms))]
+
+    merged = list(boxes)
+    changed = True
+    while changed:
+        changed = False
+        out: List[Tuple[float, float, float, float]] = []
+        for box in merged:
+            for i, other in enumerate(out):
+                overlaps = (
+                    box[0] <= other[2] + pad and other[0] <= box[2] + pad
+                    and box[1] <= other[3] + pad and other[1] <= box[3] + pad
+                )
+                if overlaps:
+                    out[i] = (min(box[0], other[0]), min(box[1], other[1]), max(box[2], other[2]), max(box[3], other[3]))
+                    changed = True
+                    break
+            else:
+                out.append(box)
+        merged = out
+
+    if len(merged) > _MAX_GRAPHIC_REGIONS:
+        return _merge_boxes(merged, pad=float("inf"))
+    return merged
+
+
+def _page_vector_content(page) -> dict:
+    """Text lines, rules, rectangles and raster regions of one pdfplumber page (points, top-left origin)."""
+    words = page.extract_words(
+        x_tolerance=2,
+        y_tolerance=2,
+        keep_blank_chars=False,
+        extra_attrs=["size", "fontname", "non_stroking_color"],
+    )
+    width, height = float(page.width), float(page.height)
+    boxes = []
+    for obj in list(page.images) + list(page.curves):
+        x0 = max(0.0, float(obj["x0"]))
+        top = max(0.0, float(obj["top"]))
+        x1 = min(width, float(obj["x1"]))
+        bottom = min(height, float(obj["bottom"]))
+        if x1 - x0 >= 1 and bottom - top >= 1:
+            boxes.append((x0, top, x1, bottom))
+    return {
+        "size": (width, height),
+        "lines": _group_text_lines(words),
+        "rules": [
+            {k: obj.get(k) for k in ("x0", "x1", "top", "bottom", "linewidth", "stroking_color")}
+            for obj in page.lines
+        ],
+        "rects": [
+            {
+                k: obj.get(k)
+                for k in ("x0", "x1", "top", "bottom", "linewidth", "stroke", "fill", "stroking_color", "non_stroking_color")
+            }
+            for obj in page.rects
+        ],
+        "regions": _merge_boxes(boxes),
+    }
+
+
+def _add_text_line(slide, line: dict, scale: float, left: int, top: int) -> None:
+    box = slide.shapes.add_textbox(
+        left + int(line["x0"] * scale),
+        top + int(line["top"] * scale),
+        max(1, int((line["x1"] - line["x0"]) * scale)),
+        max(1, int((line["bottom"] - line["top"]) * scale)),
+    )
+    tf = box.text_frame
+    tf.word_wrap = False
+    tf.auto_size = MSO_AUTO_SIZE.NONE
+    tf.margin_left = tf.margin_right = tf.margin_top = tf.margin_bottom = 0
+
+    run = tf.paragraphs[0].add_run()
+    run.text = line["text"]
+    run.font.size = Pt(max(1.0, round(line["size"] * scale / _EMU_PER_PT, 1)))
+    # "ABCDEF+Arial-BoldMT" -> family "Arial", bold
+    name = line["fontname"].split("+")[-1]
+    family = re.split(r"[-,]", name)[0]
+    if family:
+        run.font.name = family
+    lowered = name.lower()
+    run.font.bold = "bold" in lowered or "black" in lowered
+    run.font.italic = "italic" in lowered or "oblique" in lowered
+    color = _pdf_color_to_rgb(line["color"])
+    if color is not None:
+        run.font.color.rgb = color
+
+
+def _add_rect(slide, rect: dict, scale: float, left: int, top: int) -> None:
+    fill = _pdf_color_to_rgb(rect.get("non_stroking_color")) if rect.get("fill") else None
+    stroke = (_pdf_color_to_rgb(rect.get("stroking_color")) or RGBColor(0, 0, 0)) if rect.get("stroke") else None
+    if fill is None and stroke is None:
+        return
+    shape = slide.shapes.add_shape(
+        MSO_SHAPE.RECTANGLE,
+        left + int(float(rect["x0"]) * scale),
+        top + int(float(rect["top"]) * scale),
+        max(1, int((float(rect["x1"]) - float(rect["x0"])) * scale)),
+        max(1, int((float(rect["bottom"]) - float(rect["top"])) * scale)),
+    )
+    shape.shadow.inherit = False
+    if fill is not None:
+        shape.fill.solid()
+        shape.fill.fore_color.rgb = fill
+    else:
+        shape.fill.background()
+    if stroke is not None:
+        shape.line.color.rgb = stroke
+        shape.line.width = Emu(max(1, int(float(rect.get("linewidth") or 1) * scale)))
+    else:
+        shape.line.fill.background()
+
+
+def _add_rule(slide, rule: dict, scale: float, left: int, top: int) -> None:
+    line = slide.shapes.add_connector(
+        MSO_CONNECTOR.STRAIGHT,
+        left + int(float(rule["x0"]) * scale),
+        top + int(float(rule["top"]) * scale),
+        left + int(float(rule["x1"]) * scale),
+        top + int(float(rule["bottom"]) * scale),
+    )
+    line.line.color.rgb = _pdf_color_to_rgb(rule.get("stroking_color")) or RGBColor(0, 0, 0)
+    line.line.width = Emu(max(1, int(float(rule.get("linewidth") or 1) * scale)))
+
+
+def _pdf_to_pptx_text_layer(
+    pdf_bytes: bytes,
+    selected: List[int],
+    dpi: int,
+    page_dpis: Dict[int, int],
+    blank_pages: str,
+    backend: RasterBackend,
+    image_format: str,
+) -> bytes:
+    """
+    Editable slides: native text boxes for the text layer, native shapes for
+    rules and rectangles, and pictures cropped from a page render only where
+    the page has images or curves. Pages without any of those are blank.
+    """
+    doc_key = _document_key(pdf_bytes)
+    cached = _load_page_artifacts(doc_key, "vector")
+    contents: Dict[int, dict] = {i: cached[i] for i in selected if i in cached}
+    missing = [i for i in selected if i not in contents]
+    new = {}
+    for idx, page in zip(missing, _iter_pdfplumber_pages(pdf_bytes, [i + 1 for i in missing])):
+        contents[idx] = new[idx] = _page_vector_content(page)
+    _store_page_artifacts(doc_key, "vector", cached, new)
+
+    blanks = {
+        idx for idx, c in contents.items()
+        if not (c["lines"] or c["rules"] or c["rects"] or c["regions"])
+    }
+    if blank_pages == BLANK_SKIP:
+        selected = [i for i in selected if i not in blanks]
+    if not selected:
+        raise RuntimeError("No pages found in PDF." if not blanks else "All selected pages are blank.")
+
+    # Render only pages with raster regions and keep just the crops.
+    crops: Dict[int, List[Tuple[Tuple[float, float, float, float], Image.Image]]] = {}
+    to_render = [i for i in selected if contents[i]["regions"]]
+    if to_render:
+        for idx, pil in _render_pages(pdf_bytes, to_render, dpi=dpi, page_dpis=page_dpis, backend=backend):
+            k = pil.width / contents[idx]["size"][0]
+            crops[idx] = [
+                (box, pil.crop((int(box[0] * k), int(box[1] * k), math.ceil(box[2] * k), math.ceil(box[3] * k))))
+                for box in contents[idx]["regions"]
+            ]
+
+    flat = [(idx, box, crop) for idx in selected for box, crop in crops.get(idx, [])]
+    with ThreadPoolExecutor(max_workers=max(1, _PPTX_ENCODE_WORKERS)) as pool:
+        encoded = list(pool.map(lambda item: _encode_slide_image(item[2], image_format), flat))
+    pictures: Dict[int, List[Tuple[Tuple[float, float, float, float], bytes]]] = {}
+    for (idx, box, _crop), img_bytes in zip(flat, encoded):
+        pictures.setdefault(idx, []).append((box, img_bytes))
+
+    prs = Presentation()
+    slide_width = prs.slide_width
+    slide_height = prs.slide_height
+    blank_layout = _blank_slide_layout(prs)
+
+    for idx in selected:
+        slide = prs.slides.add_slide(blank_layout)
+        if idx in blanks:
+            continue
+        content = contents[idx]
+        page_w, page_h = content["size"]
+        # EMU per point, fitted and centred like the full-page pictures.
+        scale = min(slide_width / page_w, slide_height / page_h)
+        left = int((slide_width - page_w * scale) / 2)
+        top = int((slide_height - page_h * scale) / 2)
+
+        for rect in content["rects"]:
+            _add_rect(slide, rect, scale, left, top)
+        for box, img_bytes in pictures.get(idx, []):
+            slide.shapes.add_picture(
+                BytesIO(img_bytes),
+                left + int(box[0] * scale),
+                top + int(box[1] * scale),
+                width=max(1, int((box[2] - box[0]) * scale)),
+                height=max(1, int((box[3] - box[1]) * scale)),
+            )
+        for rule in content["rules"]:
+            _add_rule(slide, rule, scale, left, top)
+        for line in content["lines"]:
+            _add_text_line(slide, line, scale, left, top)
+
+    out = BytesIO()
+    prs.save(out)
+    out.seek(0)
+    return out.read()
+
+
+def pdf_to_pptx_bytes(
+    file_obj,
+    dpi: int = 150,
+    pages: Optional[str] = None,
+    raster_info: Optional[dict] = None,
+    blank_pages: str = "keep",
+    raster_backend: Optional[str] = None,
+    image_format: str = PPTX_CODEC_AUTO,
+    layout: str = PPTX_LAYOUT_IMAGE,
+) -> bytes:
+    """
+    Render each page to a full-slide picture. Pages are rendered at the DPI
+    chosen by plan_raster_dpi; if raster_info is given it receives the
+    lowest DPI actually used under "dpi". Blank pages are dropped
+    (blank_pages="skip") or become empty slides ("placeholder").
+    image_format picks the slide codec: "png", "jpeg", or "auto" (per page).
+
+    layout="text" builds editable slides instead (see _pdf_to_pptx_text_layer);
+    only images and curves are rasterized, as cropped pictures.
+    """
+    if image_format not in PPTX_CODECS:
+        raise ValueError(f"Unknown slide image format '{image_format}'.")
+    if layout not in PPTX_LAYOUTS:
+        raise ValueError(f"Unknown slide layout '{layout}'.")
     try:
         file_obj.seek(0)
     except Exception:
@@ -581,45 +2449,57 @@ def pdf_to_pptx_bytes(file_obj, dpi: int = 150) -> bytes:
     if not pdf_bytes:
         raise ValueError("Empty PDF file.")
 
-    images = convert_from_bytes(pdf_bytes, dpi=dpi)
+    page_sizes = _pdf_page_sizes(pdf_bytes)
+    selected = _resolve_pages(pages, len(page_sizes)) if pages else list(range(len(page_sizes)))
+    page_dpis = plan_raster_dpi(page_sizes, selected, dpi)
+    if raster_info is not None and page_dpis:
+        raster_info["dpi"] = min(page_dpis.values())
+
+    backend = get_raster_backend(raster_backend)
+    if layout == PPTX_LAYOUT_TEXT:
+        return _pdf_to_pptx_text_layer(pdf_bytes, selected, dpi, page_dpis, blank_pages, backend, image_format)
+
+    page_modes, blanks = _analyze_pages(pdf_bytes, selected, blank_pages, backend)
+    rendered = dict(
+        _render_pages(
+            pdf_bytes,
+            [i for i in selected if i not in blanks],
+            dpi=dpi,
+            page_dpis=page_dpis,
+            page_modes=page_modes,
+            backend=backend,
+        )
+    )
+    # None marks a blank page that gets an empty slide.
+    images = [
+        rendered.get(idx)
+        for idx in selected
+        if idx not in blanks or blank_pages == BLANK_PLACEHOLDER
+    ]
     if not images:
-        raise RuntimeError("No pages found in PDF.")
+        raise RuntimeError("No pages found in PDF." if not blanks else "All selected pages are blank.")
 
     prs = Presentation()
     slide_width = prs.slide_width
     slide_height = prs.slide_height
+    blank_layout = _blank_slide_layout(prs)
 
-    for pil_im in images:
-        img_buf = BytesIO()
-        pil_im.save(img_buf, format="PNG", optimize=True)
-        img_buf.seek(0)
-
-        blank_layout = None
-        for layout in prs.slide_layouts:
-            if len(layout.placeholders) == 0:
-                blank_layout = layout
-                break
-        if blank_layout is None:
-            blank_layout = prs.slide_layouts[6] if len(prs.slide_layouts) > 6 else prs.slide_layouts[0]
+    # Encoding dominates assembly time; Pillow's encoders release the GIL.
+    with ThreadPoolExecutor(max_workers=max(1, _PPTX_ENCODE_WORKERS)) as pool:
+        encoded = list(pool.map(lambda im: _encode_slide_image(im, image_format), images))
 
+    for pil_im, img_bytes in zip(images, encoded):
         slide = prs.slides.add_slide(blank_layout)
-        pic = slide.shapes.add_picture(img_buf, 0, 0)
-        pic_width = pic.width
-        pic_height = pic.height
-
-        scale_w = slide_width / pic_width
-        scale_h = slide_height / pic_height
-        scale = min(scale_w, scale_h)
+        if pil_im is None:
+            continue
 
-        new_width = int(pic_width * scale)
-        new_height = int(pic_height * scale)
+        # Fit inside the slide keeping the aspect ratio, centred.
+        scale = min(slide_width / pil_im.width, slide_height / pil_im.height)
+        new_width = int(pil_im.width * scale)
+        new_height = int(pil_im.height * scale)
         left = int((slide_width - new_width) / 2)
         top = int((slide_height - new_height) / 2)
-
-        pic.left = left
-        pic.top = top
-        pic.width = new_width
-        pic.height = new_height
+        slide.shapes.add_picture(BytesIO(img_bytes), left, top, width=new_width, height=new_height)
 
     out = BytesIO()
     prs.save(out)
@@ -631,6 +2511,87 @@ def pdf_to_pptx_bytes(file_obj, dpi: int = 150) -> bytes:
 # Helpers
 # -------------------------
 
+class PageSelectionError(ValueError):
+    """A page selection that is malformed or matches no page of the document."""
+
+
+class RasterBudgetExceeded(ValueError):
+    """The selected pages can't be rasterized within the pixel budget, even at the minimum DPI."""
+
+
+def parse_page_ranges(spec: str) -> List[Tuple[int, Optional[int]]]:
+    """
+    Parse a page selection such as "1-3,7,10-" into 1-based inclusive
+    (start, end) pairs. An open end ("10-") is returned as None and means
+    "through the last page". Raises PageSelectionError on malformed input.
+    """
+    ranges: List[Tuple[int, Optional[int]]] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                start_s, end_s = (x.strip() for x in part.split("-", 1))
+                start = int(start_s) if start_s else 1
+                end = int(end_s) if end_s else None
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise PageSelectionError(f"Invalid page range '{part}'.")
+        if start < 1 or (end is not None and end < start):
+            raise PageSelectionError(f"Invalid page range '{part}'.")
+        ranges.append((start, end))
+
+    if not ranges:
+        raise PageSelectionError("Empty page selection.")
+    return ranges
+
+
+def _resolve_pages(spec: Optional[str], page_count: int) -> Optional[List[int]]:
+    """Turn a page selection into sorted 0-based indices; None means all pages."""
+    if not spec or not spec.strip():
+        return None
+    selected = set()
+    for start, end in parse_page_ranges(spec):
+        end = page_count if end is None else min(end, page_count)
+        selected.update(range(start - 1, end))
+    if not selected:
+        raise PageSelectionError(f"Page selection '{spec}' matches no pages (document has {page_count}).")
+    return sorted(selected)
+
+
+def _pdf_page_count(pdf_bytes: bytes, doc_key: Optional[str] = None) -> int:
+    return len(_pdf_page_sizes(pdf_bytes, doc_key))
+
+
+def _iter_pdfplumber_pages(pdf_source, page_numbers: Optional[List[int]] = None, chunk_size: int = _PLUMBER_REOPEN_PAGES):
+    """
+    Yield pdfplumber pages (1-based page_numbers, all pages if None) from
+    PDF bytes or a path, with bounded memory: each page's cached objects
+    are released once the caller moves on, and the document is reopened
+    every chunk_size pages. Pages are only valid until the next one is
+    requested.
+    """
+    def _open(pages=None):
+        src = io.BytesIO(pdf_source) if isinstance(pdf_source, (bytes, bytearray)) else pdf_source
+        return pdfplumber.open(src, pages=pages)
+
+    if page_numbers is None:
+        with _open() as pdf:
+            page_numbers = list(range(1, len(pdf.pages) + 1))
+
+    chunk_size = max(1, chunk_size)
+    for start in range(0, len(page_numbers), chunk_size):
+        with _open(page_numbers[start:start + chunk_size]) as pdf:
+            for page in pdf.pages:
+                try:
+                    yield page
+                finally:
+                    # close() (newer pdfplumber) also drops the text-map cache.
+                    getattr(page, "close", page.flush_cache)()
+
+
 def _safe_sheet_name(name: str, max_len: int = 31) -> str:
     invalid_chars = ["\\", "/", "*", "[", "]", ":", "?"]
     for ch in invalid_chars:
@@ -647,7 +2608,161 @@ def _safe_sheet_name(name: str, max_len: int = 31) -> str:
 # PDF -> EXCEL
 # -------------------------
 
-def pdf_to_excel_bytes(file_obj) -> bytes:
+def table_likelihood(page) -> float:
+    """
+    Cheap 0..1 estimate of whether a pdfplumber page holds a table, from
+    ruling (long horizontal / vertical edges of lines and rects) and from
+    how many text rows start segments at the same x positions.
+    """
+    h_edges = sum(1 for e in page.horizontal_edges if e["x1"] - e["x0"] >= _TABLE_MIN_EDGE)
+    v_edges = sum(1 for e in page.vertical_edges if e["bottom"] - e["top"] >= _TABLE_MIN_EDGE)
+    if h_edges >= 3 and v_edges >= 2:
+        return 1.0
+    ruled = 0.5 if h_edges >= 3 else 0.0
+
+    rows: Dict[int, list] = {}
+    for ch in page.chars:
+        if ch.get("text", "").strip():
+            rows.setdefault(int(round(ch["top"])), []).append(ch)
+    if len(rows) < _TABLE_MIN_ROWS:
+        return ruled
+
+    # Segment starts per row: the first char and any char after a gap wider than two chars.
+    row_starts = []
+    for chars in rows.values():
+        chars.sort(key=lambda c: c["x0"])
+        starts = [chars[0]["x0"]]
+        for prev, ch in zip(chars, chars[1:]):
+            if ch["x0"] - prev["x1"] > max(2 * (prev["x1"] - prev["x0"]), 4.0):
+                starts.append(ch["x0"])
+        if len(starts) >= 2:
+            row_starts.append([int(x // _TABLE_X_BIN) for x in starts])
+    if len(row_starts) < _TABLE_MIN_ROWS:
+        return ruled
+
+    counts = Counter(b for starts in row_starts for b in set(starts))
+
+    def is_column(b):
+        return counts[b - 1] + counts[b] + counts[b + 1] >= _TABLE_MIN_ROWS
+
+    aligned = sum(1 for starts in row_starts if sum(1 for b in starts if is_column(b)) >= 2)
+    if aligned < _TABLE_MIN_ROWS:
+        return ruled
+    return max(ruled, min(1.0, 2.0 * aligned / len(rows)))
+
+
+def _extract_page_tables(
+    pdf_path: str,
+    page_numbers: List[int],
+    table_threshold: float = _TABLE_SCORE_THRESHOLD,
+) -> List[Tuple[int, list, Optional[str]]]:
+    """
+    Worker: open the PDF and return (page_number, tables, text) for the
+    given 1-based pages. Pages scoring below table_threshold in
+    table_likelihood() skip the table finder. Text is only extracted for
+    pages without tables, in the same pass, as the fallback when the
+    document has no tables.
+    """
+    results = []
+    for page in _iter_pdfplumber_pages(pdf_path, page_numbers):
+        try:
+            if table_threshold > 0 and table_likelihood(page) < table_threshold:
+                tables = []
+            else:
+                tables = page.extract_tables()
+        except Exception:
+            tables = []
+        text = None
+        if not tables:
+            try:
+                text = page.extract_text() or ""
+            except Exception:
+                text = ""
+        results.append((page.page_number, tables, text))
+    return results
+
+
+def _iter_page_tables(
+    pdf_bytes: bytes,
+    page_numbers: List[int],
+    table_threshold: float = _TABLE_SCORE_THRESHOLD,
+    doc_key: Optional[str] = None,
+):
+    """
+    Yield (page_number, tables, text) in page order, reusing pages already
+    extracted from this document with the same threshold. The cache is
+    read and written one chunk of pages at a time, so at most one chunk of
+    tables is held besides the page being yielded.
+    """
+    doc_key = doc_key or _document_key(pdf_bytes)
+    kind = f"tables-{table_threshold:g}"
+
+    def chunk_of(n: int) -> int:
+        return (n - 1) // _PAGE_CACHE_CHUNK_PAGES
+
+    # Only which pages are cached is kept from this pass, so one extraction
+    # (and one worker pool) covers every missing page.
+    cached_pages = set()
+    for chunk in sorted({chunk_of(n) for n in page_numbers}):
+        cached_pages.update(_load_page_artifacts(doc_key, f"{kind}-c{chunk}"))
+    missing = iter(
+        _extract_tables_parallel(pdf_bytes, [n for n in page_numbers if n not in cached_pages], table_threshold)
+    )
+
+    for chunk, group in itertools.groupby(page_numbers, key=chunk_of):
+        chunk_kind = f"{kind}-c{chunk}"
+        cached = _load_page_artifacts(doc_key, chunk_kind)
+        new = {}
+        for n in group:
+            if n not in cached_pages:
+                page_num, tables, text = next(missing)
+                new[page_num] = (tables, text)
+            elif n in cached:
+                page_num, (tables, text) = n, cached[n]
+            else:
+                # Evicted since the first pass.
+                page_num, tables, text = next(iter(_extract_tables_parallel(pdf_bytes, [n], table_threshold)))
+                new[page_num] = (tables, text)
+            yield page_num, tables, text
+        _store_page_artifacts(doc_key, chunk_kind, cached, new)
+
+
+def _extract_tables_parallel(pdf_bytes: bytes, page_numbers: List[int], table_threshold: float):
+    """
+    Yield (page_number, tables, text) in page order. Long documents are
+    split into chunks that worker processes extract in parallel; each
+    worker opens the PDF from a temp file rather than receiving the bytes.
+    """
+    if not page_numbers:
+        return
+    chunks = [page_numbers[i:i + _TABLE_PAGES_PER_TASK] for i in range(0, len(page_numbers), _TABLE_PAGES_PER_TASK)]
+    workers = min(_TABLE_WORKERS, len(chunks))
+    with scratch.job("pdf2xlsx") as job:
+        pdf_path = job.write_bytes("input.pdf", pdf_bytes)
+
+        if workers <= 1 or len(page_numbers) < _TABLE_PARALLEL_MIN_PAGES:
+            for chunk in chunks:
+                yield from _extract_page_tables(pdf_path, chunk, table_threshold)
+            return
+
+        mp_context = multiprocessing.get_context(_WORKER_START_METHOD)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+            n = len(chunks)
+            for results in pool.map(_extract_page_tables, [pdf_path] * n, chunks, [table_threshold] * n):
+                yield from results
+
+
+def _xlsx_cell(value):
+    """Table cell as written to the sheet; control characters are illegal in XLSX."""
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    return value
+
+
+def _iter_excel_input(file_obj, pages: Optional[str], table_threshold: Optional[float]):
+    """Read the upload and yield (page_number, tables, text) for the selected pages."""
+    if table_threshold is None:
+        table_threshold = _TABLE_SCORE_THRESHOLD
     try:
         file_obj.seek(0)
     except Exception:
@@ -657,83 +2772,322 @@ def pdf_to_excel_bytes(file_obj) -> bytes:
     if not pdf_bytes:
         raise ValueError("Empty PDF file.")
 
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        writer_buffer = io.BytesIO()
-        with pd.ExcelWriter(writer_buffer, engine="openpyxl") as xlsx_writer:
-            any_table = False
-            for page_num, page in enumerate(pdf.pages, start=1):
-                try:
-                    tables = page.extract_tables()
-                except Exception:
-                    tables = []
+    doc_key = _document_key(pdf_bytes)
+    page_count = _pdf_page_count(pdf_bytes, doc_key)
+    selected = _resolve_pages(pages, page_count) if pages else list(range(page_count))
+    return _iter_page_tables(pdf_bytes, [i + 1 for i in selected], table_threshold, doc_key)
 
-                if tables:
-                    for t_idx, table in enumerate(tables, start=1):
-                        try:
-                            df = pd.DataFrame(table)
-                        except Exception:
-                            df = pd.DataFrame([[" | ".join([str(c) for c in row])] for row in table])
 
-                        sheet_name = _safe_sheet_name(f"page_{page_num}_table_{t_idx}")
-                        df.to_excel(xlsx_writer, sheet_name=sheet_name, index=False, header=False)
-                        any_table = True
+def pdf_to_excel_file(file_obj, pages: Optional[str] = None, table_threshold: Optional[float] = None):
+    """
+    Write one sheet per table (or per page of text when the document has no
+    tables) with a write-only openpyxl workbook: rows are appended as each
+    page's tables arrive, so memory stays flat however many tables there
+    are. Returns an anonymous temp file positioned at 0; the caller closes it.
 
+    table_threshold (0..1, default PDF_TABLE_SCORE_THRESHOLD) is the
+    table_likelihood() score a page needs before the table finder runs.
+    """
+    wb = Workbook(write_only=True)
+    any_table = False
+    # Kept only until the first table shows up; text sheets are the no-table fallback.
+    page_texts: List[Tuple[int, str]] = []
+    for page_num, tables, text in _iter_excel_input(file_obj, pages, table_threshold):
+        for t_idx, table in enumerate(tables, start=1):
+            ws = wb.create_sheet(title=_safe_sheet_name(f"page_{page_num}_table_{t_idx}"))
+            for row in table:
+                ws.append([_xlsx_cell(c) for c in row])
+            any_table = True
+        if not any_table:
+            page_texts.append((page_num, text or ""))
+        elif page_texts:
+            page_texts = []
+
+    if not any_table:
+        for page_num, text in page_texts:
+            ws = wb.create_sheet(title=_safe_sheet_name(f"page_{page_num}_text"))
+            for line in text.splitlines() or [""]:
+                ws.append([_xlsx_cell(line)])
+    if not wb.worksheets:
+        wb.create_sheet(title="sheet")
+
+    out = scratch.output_file(suffix=".xlsx")
+    try:
+        wb.save(out)
+    except Exception:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+
+def pdf_to_excel_bytes(file_obj, pages: Optional[str] = None, table_threshold: Optional[float] = None) -> bytes:
+    with pdf_to_excel_file(file_obj, pages=pages, table_threshold=table_threshold) as f:
+        return f.read()
+
+
+def _csv_bytes(rows) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["" if c is None else c for c in row])
+    return buf.getvalue().encode("utf-8")
+
+
+def _iter_tables_csv_zip(extracted):
+    sink = _ZipStreamBuffer()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        any_table = False
+        page_texts: List[Tuple[int, str]] = []
+        for page_num, tables, text in extracted:
+            for t_idx, table in enumerate(tables, start=1):
+                zf.writestr(f"page_{page_num}_table_{t_idx}.csv", _csv_bytes(table))
+                any_table = True
+                yield sink.drain()
             if not any_table:
-                for page_num, page in enumerate(pdf.pages, start=1):
-                    text = page.extract_text() or ""
-                    rows = text.splitlines() if text else [""]
-                    df = pd.DataFrame(rows)
-                    sheet_name = _safe_sheet_name(f"page_{page_num}_text")
-                    df.to_excel(xlsx_writer, sheet_name=sheet_name, index=False, header=False)
+                page_texts.append((page_num, text or ""))
+            elif page_texts:
+                page_texts = []
+
+        if not any_table:
+            for page_num, text in page_texts:
+                zf.writestr(f"page_{page_num}_text.csv", _csv_bytes([line] for line in text.splitlines()))
+    yield sink.drain()
+
 
-        writer_buffer.seek(0)
-        data = writer_buffer.read()
+def iter_pdf_tables_csv_zip(file_obj, pages: Optional[str] = None, table_threshold: Optional[float] = None):
+    """
+    Stream a ZIP with one CSV per extracted table (page_<n>_table_<k>.csv),
+    or one CSV of text lines per page when the document has no tables.
+    Entries are emitted as pages finish; no workbook is built.
+    """
+    return _iter_tables_csv_zip(_iter_excel_input(file_obj, pages, table_threshold))
 
-    return data
+
+def pdf_tables_to_parquet_file(file_obj, pages: Optional[str] = None, table_threshold: Optional[float] = None):
+    """
+    All extracted tables as one long Parquet table: page, table and row
+    numbers followed by string columns col_1..col_N (N = widest table,
+    shorter rows padded with nulls). Without tables, text lines are stored
+    with table = 0 in col_1. Returns an anonymous temp file positioned at 0.
+    """
+    if not HAS_PYARROW:
+        raise RuntimeError("Parquet output needs the pyarrow package.")
+
+    frames = []
+    page_texts: List[Tuple[int, str]] = []
+    for page_num, tables, text in _iter_excel_input(file_obj, pages, table_threshold):
+        for t_idx, table in enumerate(tables, start=1):
+            if not table:
+                continue
+            df = pd.DataFrame(table, dtype="string")
+            df.columns = [f"col_{i + 1}" for i in range(df.shape[1])]
+            df.insert(0, "row", range(1, len(df) + 1))
+            df.insert(0, "table", t_idx)
+            df.insert(0, "page", page_num)
+            frames.append(df)
+        if not frames:
+            page_texts.append((page_num, text or ""))
+
+    if not frames:
+        for page_num, text in page_texts:
+            lines = text.splitlines()
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "page": page_num,
+                        "table": 0,
+                        "row": range(1, len(lines) + 1),
+                        "col_1": pd.array(lines, dtype="string"),
+                    }
+                )
+            )
+    if not frames:
+        raise RuntimeError("No pages found in PDF.")
+    result = pd.concat(frames, ignore_index=True)
+    # Columns missing from narrower tables come back from concat as object / NaN.
+    col_names = [c for c in result.columns if c.startswith("col_")]
+    result[col_names] = result[col_names].astype("string")
+
+    out = scratch.output_file(suffix=".parquet")
+    try:
+        result.to_parquet(out, engine="pyarrow", index=False)
+    except Exception:
+        out.close()
+        raise
+    out.seek(0)
+    return out
 
 
 # -------------------------
 # PDF -> DOCX
 # -------------------------
 
-def pdf_to_docx_bytes(file_obj):
+def _pdf2docx_convert_parallel(in_path: str, out_path: str, start: int, end: int, cpu_count: int) -> None:
+    """Worker-process entry point: pdf2docx's multi-processing conversion of pages [start, end)."""
+    conv = Converter(in_path)
+    try:
+        conv.convert(out_path, start=start, end=end, multi_processing=True, cpu_count=cpu_count)
+    finally:
+        conv.close()
+
+
+def pdf_to_docx_bytes(
+    file_obj,
+    pages: Optional[str] = None,
+    multi_processing: Optional[bool] = None,
+    cpu_count: Optional[int] = None,
+):
     """
     Convert PDF → DOCX using pdf2docx only (no LibreOffice).
+
+    multi_processing spreads the pages over cpu_count processes (capped by
+    PDF2DOCX_CPU_COUNT); None enables it for jobs of _DOCX_PARALLEL_MIN_PAGES
+    or more. pdf2docx only parallelises a contiguous start/end range, so a
+    scattered page selection runs in one process. Parallel conversions run
+    in a separate, freshly started process so that pdf2docx never forks a
+    threaded server process. Scratch files live in a
+    temporary directory that is removed when the conversion finishes.
     """
-    from pdf2docx import Converter
-    from io import BytesIO
-    import tempfile
-    import os
+    if not HAS_PDF2DOCX:
+        raise RuntimeError("pdf2docx is not installed.")
 
+    try:
+        file_obj.seek(0)
+    except Exception:
+        pass
     pdf_bytes = file_obj.read()
     if not pdf_bytes:
         raise RuntimeError("Empty PDF")
 
-    tmp = tempfile.mkdtemp(prefix="pdf2docx_")
-    in_path = os.path.join(tmp, "input.pdf")
-    out_path = os.path.join(tmp, "output.docx")
-
-    with open(in_path, "wb") as f:
-        f.write(pdf_bytes)
-
-    conv = Converter(in_path)
-    try:
-        conv.convert(out_path)
-    finally:
-        conv.close()
+    page_count = _pdf_page_count(pdf_bytes)
+    selected = _resolve_pages(pages, page_count) if pages else list(range(page_count))
+    contiguous = bool(selected) and selected[-1] - selected[0] + 1 == len(selected)
+
+    workers = min(cpu_count or _DOCX_CPU_COUNT, _DOCX_CPU_COUNT, len(selected))
+    if multi_processing is None:
+        multi_processing = len(selected) >= _DOCX_PARALLEL_MIN_PAGES
+    multi_processing = multi_processing and contiguous and workers > 1
+
+    with scratch.job("pdf2docx") as job:
+        in_path = job.write_bytes("input.pdf", pdf_bytes)
+        out_path = job.path_for("output.docx")
+
+        if multi_processing:
+            # pdf2docx forks its own pool, which is only safe from a single-threaded
+            # process: run it in a fresh (forkserver / spawn) child, never a request thread.
+            mp_context = multiprocessing.get_context(_WORKER_START_METHOD)
+            with ProcessPoolExecutor(max_workers=1, mp_context=mp_context) as pool:
+                # end is exclusive in pdf2docx
+                pool.submit(_pdf2docx_convert_parallel, in_path, out_path, selected[0], selected[-1] + 1, workers).result()
+        else:
+            conv = Converter(in_path)
+            try:
+                if pages:
+                    conv.convert(out_path, pages=selected)
+                else:
+                    conv.convert(out_path)
+            finally:
+                conv.close()
 
-    if not os.path.exists(out_path):
-        raise RuntimeError("pdf2docx failed to create DOCX.")
+        if not os.path.exists(out_path):
+            raise RuntimeError("pdf2docx failed to create DOCX.")
+        job.track(out_path)
+        job.check()
 
-    with open(out_path, "rb") as f:
-        return f.read()
+        with open(out_path, "rb") as f:
+            return f.read()
 
 
 # -------------------------
 # PDF -> JPG
 # -------------------------
 
-def pdf_to_jpg_bytes(file_obj, filename: Optional[str] = None, dpi: int = 200, first_only: bool = False) -> Tuple[bytes, str, str]:
+class _ZipStreamBuffer:
+    """
+    Write-only sink for zipfile.ZipFile. It is not seekable, so zipfile
+    writes local headers with data descriptors and never goes back; drain()
+    hands out whatever has been written since the last call.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _iter_jpg_zip(
+    pdf_bytes: bytes,
+    page_indices: List[int],
+    dpi: int,
+    page_dpis: Optional[Dict[int, int]] = None,
+    page_modes: Optional[Dict[int, str]] = None,
+    placeholders: Optional[Dict[int, bytes]] = None,
+    backend: Optional[RasterBackend] = None,
+):
+    """
+    Render runs of pages in one backend call each and emit every ZIP entry
+    as soon as its page file is complete. JPEGs are already compressed, so
+    entries are STORED. Placeholder pages are slotted in in page order.
+    """
+    placeholders = placeholders or {}
+    pending = deque(sorted((i, placeholders[i]) for i in page_indices if i in placeholders))
+    to_render = [i for i in page_indices if i not in placeholders]
+
+    sink = _ZipStreamBuffer()
+    with scratch.job("pdf2jpg") as job:
+        tmp_dir = job.path
+        pdf_path = job.write_bytes("input.pdf", pdf_bytes)
+
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+            for idx, path in _render_pages_to_jpeg_files(
+                pdf_path, to_render, dpi, tmp_dir, page_dpis=page_dpis, page_modes=page_modes, backend=backend
+            ):
+                while pending and pending[0][0] < idx:
+                    blank_idx, data = pending.popleft()
+                    zf.writestr(f"page_{blank_idx + 1}.jpg", data)
+                job.track(path)
+                job.check()
+                zf.write(path, arcname=f"page_{idx + 1}.jpg")
+                job.remove(path)
+                yield sink.drain()
+            while pending:
+                blank_idx, data = pending.popleft()
+                zf.writestr(f"page_{blank_idx + 1}.jpg", data)
+                yield sink.drain()
+        yield sink.drain()
+
+
+def iter_pdf_to_jpg(
+    file_obj,
+    filename: Optional[str] = None,
+    dpi: int = 200,
+    first_only: bool = False,
+    pages: Optional[str] = None,
+    raster_info: Optional[dict] = None,
+    blank_pages: str = "keep",
+    raster_backend: Optional[str] = None,
+):
+    """
+    Returns (chunks, out_name, content_type). A single page comes back as
+    one JPEG chunk; several pages come back as a ZIP that is produced
+    incrementally while later pages are still rendering.
+
+    Pages are rendered at the DPI chosen by plan_raster_dpi; if raster_info
+    is given it receives the lowest DPI actually used under "dpi".
+    Blank pages are dropped (blank_pages="skip") or replaced by a plain
+    white JPEG without rendering ("placeholder").
+    """
     try:
         file_obj.seek(0)
     except Exception:
@@ -743,24 +3097,69 @@ def pdf_to_jpg_bytes(file_obj, filename: Optional[str] = None, dpi: int = 200, f
         filename = "output.pdf"
     base_name = filename.rsplit(".", 1)[0]
 
-    images = convert_from_bytes(pdf_bytes, dpi=dpi)
-    if not images:
+    page_sizes = _pdf_page_sizes(pdf_bytes)
+    selected = _resolve_pages(pages, len(page_sizes)) if pages else list(range(len(page_sizes)))
+    if first_only:
+        # Only rasterize the one page we return.
+        selected = selected[:1]
+    if not selected:
         raise RuntimeError("No pages found in PDF.")
 
-    if first_only or len(images) == 1:
-        img_buf = BytesIO()
-        images[0].save(img_buf, format="JPEG", quality=85)
-        img_bytes = img_buf.getvalue()
-        out_name = f"{base_name}.jpg"
-        return img_bytes, out_name, "image/jpeg"
-
-    zip_buf = BytesIO()
-    with zipfile.ZipFile(zip_buf, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for idx, img in enumerate(images, start=1):
-            single_buf = BytesIO()
-            img.save(single_buf, format="JPEG", quality=85)
-            single_buf.seek(0)
-            zf.writestr(f"page_{idx}.jpg", single_buf.read())
-    zip_buf.seek(0)
-    out_name = f"{base_name}.zip"
-    return zip_buf.getvalue(), out_name, "application/zip"
\ No newline at end of file
+    backend = get_raster_backend(raster_backend)
+    page_modes, blanks = _analyze_pages(pdf_bytes, selected, blank_pages, backend)
+    if blank_pages == BLANK_SKIP and blanks:
+        selected = [i for i in selected if i not in blanks]
+        if not selected:
+            raise RuntimeError("All selected pages are blank.")
+
+    page_dpis = plan_raster_dpi(page_sizes, selected, dpi)
+    if raster_info is not None:
+        raster_info["dpi"] = min(page_dpis.values())
+    placeholders = {}
+    if blank_pages == BLANK_PLACEHOLDER:
+        placeholders = {i: _blank_page_jpeg(page_sizes[i], page_dpis[i]) for i in selected if i in blanks}
+
+    if len(selected) == 1 and selected[0] in placeholders:
+        return iter([placeholders[selected[0]]]), f"{base_name}.jpg", "image/jpeg"
+
+    if len(selected) == 1:
+        with scratch.job("pdf2jpg") as job:
+            tmp_dir = job.path
+            pdf_path = job.write_bytes("input.pdf", pdf_bytes)
+            rendered = list(
+                _render_pages_to_jpeg_files(
+                    pdf_path, selected, dpi, tmp_dir, page_dpis=page_dpis, page_modes=page_modes, backend=backend
+                )
+            )
+            if not rendered:
+                raise RuntimeError("No pages found in PDF.")
+            with open(rendered[0][1], "rb") as f:
+                img_bytes = f.read()
+        return iter([img_bytes]), f"{base_name}.jpg", "image/jpeg"
+
+    return (
+        _iter_jpg_zip(pdf_bytes, selected, dpi, page_dpis, page_modes, placeholders, backend),
+        f"{base_name}.zip",
+        "application/zip",
+    )
+
+
+def pdf_to_jpg_bytes(
+    file_obj,
+    filename: Optional[str] = None,
+    dpi: int = 200,
+    first_only: bool = False,
+    pages: Optional[str] = None,
+    blank_pages: str = "keep",
+    raster_backend: Optional[str] = None,
+) -> Tuple[bytes, str, str]:
+    chunks, out_name, content_type = iter_pdf_to_jpg(
+        file_obj,
+        filename=filename,
+        dpi=dpi,
+        first_only=first_only,
+        pages=pages,
+        blank_pages=blank_pages,
+        raster_backend=raster_backend,
+    )
+    return b"".join(chunks), out_name, content_type
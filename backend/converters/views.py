@@ -1,13 +1,17 @@
+# === Standard Library Imports ===
+import itertools
+
 # === Django / DRF Imports ===
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import serializers, status
 
 # === Serializers ===
 from .serializers import (
-    PDFUploadSerializer,
+    PDFToDocxSerializer,
+    PDFToExcelSerializer,
     PDFToJPGSerializer,
     PDFToPPTXSerializer,
     PDFToTxtSerializer,
@@ -18,18 +22,28 @@ from .serializers import (
     TXTToPDFSerializer,
 )
 
+# === Scratch space ===
+from .scratch import scratch
+
+# === Upload handlers ===
+from .upload_handlers import ImagesToPdfUploadHandler
+
 # === Utils (conversion functions) ===
 from .utils import (
     pdf_to_docx_bytes,
-    pdf_to_jpg_bytes,
-    pdf_to_excel_bytes,
+    iter_pdf_to_jpg,
+    pdf_to_excel_file,
+    iter_pdf_tables_csv_zip,
+    pdf_tables_to_parquet_file,
     pdf_to_pptx_bytes,
-    pdf_to_txt_bytes,
+    iter_pdf_to_txt_bytes,
+    PageSelectionError,
+    RasterBudgetExceeded,
     docx_to_pdf_bytes,
-    images_to_pdf_bytes,
+    images_to_pdf_file,
     xlsx_to_pdf_bytes,
     pptx_to_pdf_bytes,
-    txt_to_pdf_bytes,
+    txt_to_pdf_file,
 )
 
 class ConvertTxtToPdfView(APIView):
@@ -48,8 +62,9 @@ class ConvertTxtToPdfView(APIView):
 
         txt_file = serializer.validated_data["file"]
 
+        # rendered line by line into a spooled file
         try:
-            pdf_bytes = txt_to_pdf_bytes(txt_file)
+            pdf_file = txt_to_pdf_file(txt_file)
         except Exception as e:
             return Response(
                 {"detail": f"Failed to convert TXT to PDF. {e}"},
@@ -57,10 +72,7 @@ class ConvertTxtToPdfView(APIView):
             )
 
         filename = txt_file.name.rsplit(".", 1)[0] + ".pdf"
-        response = HttpResponse(pdf_bytes, content_type="application/pdf")
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
-        response["Content-Length"] = str(len(pdf_bytes))
-        return response
+        return FileResponse(pdf_file, as_attachment=True, filename=filename, content_type="application/pdf")
 
 
 class ConvertPptxToPdfView(APIView):
@@ -136,36 +148,74 @@ class ConvertImagesToPdfView(APIView):
     Form-data:
       - files[] (multiple) OR
       - file (single)
+      - page_size (optional "A4" | "LETTER"; images are fitted onto the page)
+      - dpi (optional int; larger images are downsampled to this resolution)
+    page_size and dpi may also be given in the query string; only then can
+    the "files" images be converted while the upload is still arriving.
     Response: application/pdf
     """
     permission_classes = [AllowAny]
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Must be installed before anything reads the request body.
+        self.upload_handler = ImagesToPdfUploadHandler(request)
+        request.upload_handlers.insert(0, self.upload_handler)
+        return super().initialize_request(request, *args, **kwargs)
+
     def post(self, request, *args, **kwargs):
+        try:
+            return self._convert(request)
+        finally:
+            # no-op once the view has taken the pipeline
+            self.upload_handler.discard()
+
+    def _convert(self, request):
         # use serializer to validate presence of files
         serializer = ImagesToPDFSerializer(data=request.data)
         if not serializer.is_valid():
+            if set(serializer.errors) - {"files", "file", "non_field_errors"}:
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             # If serializer fails, also try to extract files from request.FILES directly for multipart clients
             # (some clients don't populate data for ListField properly)
             files_from_request = request.FILES.getlist("files") or ( [request.FILES.get("file")] if request.FILES.get("file") else [] )
             if not files_from_request:
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             files = files_from_request
+            page_size = request.data.get("page_size") or None
+            dpi = int(request.data["dpi"]) if request.data.get("dpi") else None
         else:
             files = serializer.validated_data.get("files", [])
+            page_size = serializer.validated_data.get("page_size")
+            dpi = serializer.validated_data.get("dpi")
 
-        # convert images to pdf bytes
+        # form fields win over the query string
+        try:
+            for name in ("page_size", "dpi"):
+                value = request.query_params.get(name)
+                if value and not request.data.get(name):
+                    parsed = serializer.fields[name].run_validation(value)
+                    if name == "page_size":
+                        page_size = parsed
+                    else:
+                        dpi = parsed
+        except serializers.ValidationError as e:
+            return Response({name: e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        # convert images to a pdf, written page by page into a spooled file;
+        # use the pages the upload handler already converted when they match
         try:
-            pdf_bytes = images_to_pdf_bytes(files)
+            pipeline = self.upload_handler.take_pipeline(page_size, dpi, count=len(files))
+            if pipeline is not None:
+                pdf_file = pipeline.finish()
+            else:
+                pdf_file = images_to_pdf_file(files, page_size=page_size, dpi=dpi)
         except ValueError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"detail": f"Failed to convert images to PDF. {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         filename = "images.pdf"
-        response = HttpResponse(pdf_bytes, content_type="application/pdf")
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
-        response["Content-Length"] = str(len(pdf_bytes))
-        return response
+        return FileResponse(pdf_file, as_attachment=True, filename=filename, content_type="application/pdf")
 
 
 class ConvertDocxToPdfView(APIView):
@@ -205,7 +255,11 @@ class ConvertPdfToTxtView(APIView):
       - lang (tesseract language)
       - join_pages ("none" | "space" | "newline")
       - preserve_layout (bool)
-    Response: text/plain (.txt)
+      - pages (optional, e.g. "1-3,7,10-")
+      - mode ("fast" | "balanced" | "accurate", default "accurate")
+      - blank_pages ("keep" | "skip" | "placeholder", default "keep")
+      - raster_backend ("poppler" | "pdfium", default from PDF_RASTER_BACKEND)
+    Response: text/plain (.txt), streamed page by page
     """
     permission_classes = [AllowAny]
 
@@ -219,15 +273,29 @@ class ConvertPdfToTxtView(APIView):
         lang = serializer.validated_data.get("lang", "eng")
         join_pages = serializer.validated_data.get("join_pages")
         preserve_layout = serializer.validated_data.get("preserve_layout", True)
+        pages = serializer.validated_data.get("pages") or None
+        mode = serializer.validated_data.get("mode", "accurate")
+        blank_pages = serializer.validated_data.get("blank_pages", "keep")
+        raster_backend = serializer.validated_data.get("raster_backend")
 
         try:
-            txt_bytes = pdf_to_txt_bytes(
+            chunks = iter_pdf_to_txt_bytes(
                 pdf_file,
                 ocr=ocr,
                 lang=lang,
                 join_pages=join_pages,
-                preserve_layout=preserve_layout
+                preserve_layout=preserve_layout,
+                pages=pages,
+                mode=mode,
+                blank_pages=blank_pages,
+                raster_backend=raster_backend,
             )
+            # Extract the first page up front so early failures still get a 500.
+            first_chunk = next(chunks, b"")
+        except RasterBudgetExceeded as e:
+            return Response({"detail": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except PageSelectionError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {"detail": f"Failed to convert PDF to TXT. {e}"},
@@ -235,9 +303,11 @@ class ConvertPdfToTxtView(APIView):
             )
 
         filename = pdf_file.name.rsplit(".", 1)[0] + ".txt"
-        response = HttpResponse(txt_bytes, content_type="text/plain; charset=utf-8")
+        response = StreamingHttpResponse(
+            itertools.chain([first_chunk], chunks),
+            content_type="text/plain; charset=utf-8",
+        )
         response["Content-Disposition"] = f'attachment; filename="{filename}"'
-        response["Content-Length"] = str(len(txt_bytes))
         return response
 
 
@@ -247,7 +317,13 @@ class ConvertPdfToPptxView(APIView):
     Form-data:
       - file (pdf)
       - dpi (int, default 150)
+      - image_format ("auto" | "png" | "jpeg", default "auto")
+      - layout ("image" | "text", default "image"; text gives editable slides)
+      - blank_pages ("keep" | "skip" | "placeholder", default "keep")
+      - raster_backend ("poppler" | "pdfium", default from PDF_RASTER_BACKEND)
+      - pages (optional, e.g. "1-3,7,10-")
     Response: .pptx file
+    Header X-Render-DPI: lowest DPI actually used (oversized pages are rendered lower)
     """
     permission_classes = [AllowAny]
 
@@ -258,9 +334,28 @@ class ConvertPdfToPptxView(APIView):
 
         pdf_file = serializer.validated_data["file"]
         dpi = serializer.validated_data.get("dpi", 150)
+        image_format = serializer.validated_data.get("image_format", "auto")
+        layout = serializer.validated_data.get("layout", "image")
+        pages = serializer.validated_data.get("pages") or None
+        blank_pages = serializer.validated_data.get("blank_pages", "keep")
+        raster_backend = serializer.validated_data.get("raster_backend")
 
+        raster_info = {}
         try:
-            pptx_bytes = pdf_to_pptx_bytes(pdf_file, dpi=dpi)
+            pptx_bytes = pdf_to_pptx_bytes(
+                pdf_file,
+                dpi=dpi,
+                pages=pages,
+                raster_info=raster_info,
+                blank_pages=blank_pages,
+                raster_backend=raster_backend,
+                image_format=image_format,
+                layout=layout,
+            )
+        except RasterBudgetExceeded as e:
+            return Response({"detail": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except PageSelectionError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {"detail": f"Failed to convert PDF to PPTX. {e}"},
@@ -274,53 +369,114 @@ class ConvertPdfToPptxView(APIView):
         )
         response["Content-Disposition"] = f'attachment; filename="{filename}"'
         response["Content-Length"] = str(len(pptx_bytes))
+        if "dpi" in raster_info:
+            response["X-Render-DPI"] = str(raster_info["dpi"])
         return response
 
 
 class ConvertPdfToExcelView(APIView):
     """
     POST /api/pdf-to-excel/
-    Response: .xlsx file
+    Form-data:
+      - file (pdf)
+      - pages (optional, e.g. "1-3,7,10-")
+      - table_threshold (optional float 0-1; pages scoring lower skip table detection, 0 = every page)
+      - output_format ("xlsx" | "csv" | "parquet", default "xlsx")
+    Response: .xlsx file, a streamed .zip of CSVs, or a .parquet file
     """
     permission_classes = [AllowAny]
 
     def post(self, request, *args, **kwargs):
-        serializer = PDFUploadSerializer(data=request.data)
+        serializer = PDFToExcelSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         pdf_file = serializer.validated_data["file"]
+        pages = serializer.validated_data.get("pages") or None
+        table_threshold = serializer.validated_data.get("table_threshold")
+        output_format = serializer.validated_data.get("output_format", "xlsx")
+        base_name = pdf_file.name.rsplit(".", 1)[0]
+
+        if output_format == "csv":
+            try:
+                chunks = iter_pdf_tables_csv_zip(pdf_file, pages=pages, table_threshold=table_threshold)
+                # Extract the first pages up front so early failures still get a 500.
+                first_chunk = next(chunks, b"")
+            except PageSelectionError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            except Exception as e:
+                return Response(
+                    {"detail": f"Failed to convert PDF to CSV. {e}"},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                )
+            response = StreamingHttpResponse(itertools.chain([first_chunk], chunks), content_type="application/zip")
+            response["Content-Disposition"] = f'attachment; filename="{base_name}.zip"'
+            return response
+
+        if output_format == "parquet":
+            try:
+                parquet_file = pdf_tables_to_parquet_file(pdf_file, pages=pages, table_threshold=table_threshold)
+            except PageSelectionError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            except Exception as e:
+                return Response(
+                    {"detail": f"Failed to convert PDF to Parquet. {e}"},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                )
+            return FileResponse(
+                parquet_file,
+                as_attachment=True,
+                filename=f"{base_name}.parquet",
+                content_type="application/vnd.apache.parquet",
+            )
 
         try:
-            xlsx_bytes = pdf_to_excel_bytes(pdf_file)
+            xlsx_file = pdf_to_excel_file(pdf_file, pages=pages, table_threshold=table_threshold)
+        except PageSelectionError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {"detail": f"Failed to convert PDF to Excel. {e}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        filename = pdf_file.name.rsplit(".", 1)[0] + ".xlsx"
-        response = HttpResponse(
-            xlsx_bytes,
+        filename = base_name + ".xlsx"
+        # FileResponse closes (and so deletes) the temp file once it has been sent.
+        response = FileResponse(
+            xlsx_file,
+            as_attachment=True,
+            filename=filename,
             content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
-        response["Content-Length"] = str(len(xlsx_bytes))
         return response
 
 
 class ConvertPdfToDocxView(APIView):
+    """
+    POST /api/pdf-to-docx/
+    Form-data:
+      - file (pdf)
+      - pages (optional, e.g. "1-3,7,10-")
+      - parallel (optional bool; default: on for longer documents)
+      - cpu_count (optional int, capped by PDF2DOCX_CPU_COUNT)
+    Response: .docx file
+    """
     permission_classes = [AllowAny]
 
     def post(self, request, *args, **kwargs):
-        serializer = PDFUploadSerializer(data=request.data)
+        serializer = PDFToDocxSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         pdf_file = serializer.validated_data["file"]
+        pages = serializer.validated_data.get("pages") or None
+        parallel = serializer.validated_data.get("parallel")
+        cpu_count = serializer.validated_data.get("cpu_count")
 
         try:
-            docx_bytes = pdf_to_docx_bytes(pdf_file)
+            docx_bytes = pdf_to_docx_bytes(pdf_file, pages=pages, multi_processing=parallel, cpu_count=cpu_count)
+        except PageSelectionError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {"detail": f"Failed to convert PDF. {e}"},
@@ -343,7 +499,11 @@ class ConvertPdfToJpgView(APIView):
     Optional:
       - dpi (int)
       - first_page_only (bool)
-    Returns JPEG or ZIP
+      - blank_pages ("keep" | "skip" | "placeholder", default "keep")
+      - raster_backend ("poppler" | "pdfium", default from PDF_RASTER_BACKEND)
+      - pages (optional, e.g. "1-3,7,10-")
+    Returns JPEG, or a ZIP streamed while pages render
+    Header X-Render-DPI: lowest DPI actually used (oversized pages are rendered lower)
     """
     permission_classes = [AllowAny]
 
@@ -355,23 +515,52 @@ class ConvertPdfToJpgView(APIView):
         pdf_file = serializer.validated_data["file"]
         dpi = serializer.validated_data.get("dpi", 200)
         first_page_only = serializer.validated_data.get("first_page_only", False)
+        pages = serializer.validated_data.get("pages") or None
+        blank_pages = serializer.validated_data.get("blank_pages", "keep")
+        raster_backend = serializer.validated_data.get("raster_backend")
 
+        raster_info = {}
         try:
-            out_bytes, out_filename, content_type = pdf_to_jpg_bytes(
+            chunks, out_filename, content_type = iter_pdf_to_jpg(
                 pdf_file,
                 filename=pdf_file.name,
                 dpi=dpi,
-                first_only=first_page_only
+                first_only=first_page_only,
+                pages=pages,
+                raster_info=raster_info,
+                blank_pages=blank_pages,
+                raster_backend=raster_backend,
             )
+            # Render the first page up front so early failures still get a 500.
+            first_chunk = next(chunks, b"")
+        except RasterBudgetExceeded as e:
+            return Response({"detail": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except PageSelectionError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {"detail": f"Failed to convert PDF to JPG. {e}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        response = HttpResponse(out_bytes, content_type=content_type)
+        if content_type == "application/zip":
+            response = StreamingHttpResponse(itertools.chain([first_chunk], chunks), content_type=content_type)
+        else:
+            response = HttpResponse(first_chunk, content_type=content_type)
+            response["Content-Length"] = str(len(first_chunk))
         response["Content-Disposition"] = f'attachment; filename="{out_filename}"'
-        response["Content-Length"] = str(len(out_bytes))
+        if "dpi" in raster_info:
+            response["X-Render-DPI"] = str(raster_info["dpi"])
         return response
 
 
+class ScratchUsageView(APIView):
+    """
+    GET /api/scratch-usage/
+    Admin only. Current scratch-space usage: roots, quotas and one entry
+    per job directory (path, owning pid, bytes, age).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(scratch.usage())